@@ -1,25 +1,70 @@
+import os
 import streamlit as st
-from offmenu.retriever import ask, find_episode_filter
-from offmenu.router import get_route
-from offmenu.csv_answerer import answer_from_csv
-import pandas as pd
+
+def get_secret(key: str) -> str:
+    try:
+        return st.secrets[key]
+    except Exception:
+        return os.getenv(key)
+
+# when set, the UI is a thin client of the offmenu.api service instead of answering in-process
+API_URL = get_secret("OFFMENU_API_URL")
+
+if API_URL:
+    import requests
+else:
+    from offmenu.retriever import ask, find_episode_filter
+    from offmenu.router import get_route
+    from offmenu.csv_answerer import answer_from_csv, answer_meta
+    from offmenu.tracing import trace
 
 st.set_page_config(page_title="Off Menu Chatbot", page_icon="🍽️")
 
 st.title("🍽️ Off Menu Chatbot")
 st.markdown("Ask anything about the Off Menu podcast with Ed Gamble and James Acaster.")
 
-# Prompt for answering meta questions
-def answer_meta() -> str:
-    df = pd.read_csv("data/menu_choices.csv")
-    episode_count = df["episode"].nunique()
-    guest_count = df["guest"].nunique()
-    return (
-        f"I'm an AI assistant built specifically for the Off Menu podcast, hosted by Ed Gamble "
-        f"and James Acaster. I have access to transcripts and menu choice data from {episode_count} "
-        f"episodes covering {guest_count} guests. You can ask me about what guests chose for their "
-        f"dream meal, patterns across episodes, or anything discussed in the show."
+show_debug = st.sidebar.checkbox("Show debug panel", value=False)
+
+def render_debug(request_trace: dict):
+    with st.expander(f"Debug · {request_trace['duration_ms']:.0f} ms"):
+        st.dataframe([
+            {"stage": s["name"], "start ms": s["offset_ms"], "ms": s["duration_ms"], **s.get("tokens", {})}
+            for s in request_trace["spans"]
+        ])
+        st.json(request_trace, expanded=False)
+
+def show_route_caption(route: str, episode_filter: str | None):
+    if route == "csv":
+        st.caption("Searching menu choices data")
+    elif episode_filter:
+        st.caption(f"Searching episode {episode_filter}")
+
+def answer_via_api(question: str) -> tuple[str, dict]:
+    resp = requests.post(
+        f"{API_URL.rstrip('/')}/ask",
+        params={"debug": 1},
+        json={"question": question},
+        timeout=120
     )
+    resp.raise_for_status()
+    result = resp.json()
+    show_route_caption(result["route"], result["episode_filter"])
+    return result["answer"], result["trace"]
+
+def answer_in_process(question: str) -> tuple[str, dict]:
+    with trace("chat", question=question) as request_trace:
+        route = get_route(question)
+        request_trace.set(route=route)
+        if route == "csv":
+            show_route_caption(route, None)
+            response = answer_from_csv(question)
+        elif route == "meta":
+            response = answer_meta()
+        else:
+            episode_filter = find_episode_filter(question)
+            show_route_caption(route, episode_filter)
+            response = ask(question, route)
+    return response, request_trace.to_dict()
 
 # keep chat history in session state
 if "messages" not in st.session_state:
@@ -29,6 +74,8 @@ if "messages" not in st.session_state:
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
+        if show_debug and message.get("trace"):
+            render_debug(message["trace"])
 
 # chat input
 if prompt := st.chat_input("Ask a question about Off Menu..."):
@@ -40,17 +87,16 @@ if prompt := st.chat_input("Ask a question about Off Menu..."):
     # get and show response
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
-            route = get_route(prompt)
-            if route == "csv":
-                st.caption("Searching menu choices data")
-                response = answer_from_csv(prompt)
-            elif route == "meta":
-                response = answer_meta()
+            if API_URL:
+                response, request_trace = answer_via_api(prompt)
             else:
-                episode_filter = find_episode_filter(prompt)
-                if episode_filter:
-                    st.caption(f"Searching episode {episode_filter}")
-                response = ask(prompt)
-            st.markdown(response)
+                response, request_trace = answer_in_process(prompt)
+        st.markdown(response)
+        if show_debug:
+            render_debug(request_trace)
 
-    st.session_state.messages.append({"role": "assistant", "content": response})
\ No newline at end of file
+    st.session_state.messages.append({
+        "role": "assistant",
+        "content": response,
+        "trace": request_trace
+    })
\ No newline at end of file
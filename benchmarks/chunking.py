@@ -0,0 +1,319 @@
+"""Chunking benchmark: retrieval recall against index size and embedding cost.
+
+Re-chunks the cleaned transcripts with each strategy in the grid, embeds the chunks through a
+local per-text cache (so only new chunk texts cost Voyage calls), builds a LocalVectorIndex per
+setting and scores recall@k on questions labelled from the menu CSV.
+
+    python -m benchmarks.chunking
+    python -m benchmarks.chunking --grid characters:500:100,sentences:1000:150,tokens:256:32 --json chunking.json
+
+A question is answered by a retrieved chunk if the chunk comes from the guest's episode and
+contains words from their recorded menu choice. Recall is reported unfiltered and with the
+episode filter the retriever applies when a question names a guest.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import voyageai
+from dotenv import load_dotenv
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "pipeline"))
+
+import chunker
+from offmenu import replay
+from offmenu.vector_index import LocalVectorIndex
+
+from benchmarks.latency import percentile
+
+load_dotenv()
+
+CLEANED_DIR = os.path.join(BASE_DIR, "data", "cleaned")
+CSV_FILE = os.path.join(BASE_DIR, "data", "menu_choices_normalised.csv")
+CACHE_FILE = os.path.join(BASE_DIR, "data", "embedding_cache.sqlite")
+EMBEDDING_MODEL = "voyage-3-lite"
+BATCH_SIZE = 128
+
+# strategy:chunk_size:overlap; sizes are characters except for "tokens"
+DEFAULT_GRID = (
+    "characters:500:100",   # what chunker.py ships with
+    "characters:500:0",
+    "characters:1000:200",
+    "sentences:500:100",
+    "sentences:1000:150",
+    "speaker_turns:800:0",
+    "speaker_turns:1500:200",
+    "tokens:128:16",
+    "tokens:256:32",
+)
+K_VALUES = (1, 3, 5, 10)
+
+# menu columns that make answerable questions; still/sparkling is too generic a word to label by
+QUESTION_FIELDS = {
+    "starter": "starter",
+    "main": "main course",
+    "dessert": "dessert",
+    "drink": "drink",
+    "poppadoms_or_bread": "poppadoms or bread choice",
+    "side_dish": "side dish",
+}
+STOPWORDS = {
+    "with", "from", "their", "made", "and", "the", "some", "that", "this", "which", "served",
+    "homemade", "home", "mum's", "mums", "restaurant", "london",
+}
+MIN_KEYWORD_LENGTH = 4
+
+
+# --- corpus and questions ---
+
+def load_transcripts(cleaned_dir: str) -> list[dict]:
+    transcripts = []
+    for filename in sorted(os.listdir(cleaned_dir)):
+        if not filename.endswith(".txt"):
+            continue
+        with open(os.path.join(cleaned_dir, filename), "r", encoding="utf-8") as f:
+            text = f.read()
+        episode, guest = chunker.parse_metadata(text)
+        transcripts.append({"episode": episode, "guest": guest, "body": chunker.remove_metadata_header(text)})
+    return transcripts
+
+
+def keywords(value: str, body: str) -> list[str]:
+    # distinctive words of the CSV answer that the guest actually said
+    words = {w for w in re.findall(r"[a-z][a-z'’-]+", value.lower())
+             if len(w) >= MIN_KEYWORD_LENGTH and w not in STOPWORDS}
+    return sorted(w for w in words if w in body)
+
+
+def build_questions(csv_file: str, transcripts: list[dict], limit: int, seed: int) -> list[dict]:
+    bodies = {t["episode"]: t["body"].lower() for t in transcripts}
+    questions = []
+    with open(csv_file, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            body = bodies.get(row["episode"])
+            if body is None:
+                continue
+            for field, label in QUESTION_FIELDS.items():
+                value = (row.get(field) or "").strip()
+                words = keywords(value, body) if value else []
+                if words:
+                    questions.append({
+                        "question": f"What did {row['guest']} choose as their {label}?",
+                        "episode": row["episode"],
+                        "keywords": words,
+                    })
+    random.Random(seed).shuffle(questions)
+    return questions[:limit] if limit else questions
+
+
+def load_questions(path: str) -> list[dict]:
+    # hand-labelled alternative: JSONL with question, episode and keywords
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_answer(chunk: dict, question: dict) -> bool:
+    if chunk["episode"] != question["episode"]:
+        return False
+    text = chunk["text"].lower()
+    found = sum(w in text for w in question["keywords"])
+    return found >= min(2, len(question["keywords"]))
+
+
+# --- embeddings ---
+
+class EmbeddingCache:
+    """Vectors and token counts keyed on (model, input_type, text), so re-chunking only pays for new texts."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, tokens INTEGER, vector BLOB)")
+
+    @staticmethod
+    def key(model: str, input_type: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{input_type}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict[str, tuple[int, np.ndarray]]:
+        found = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, tokens, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+            )
+            for key, tokens, blob in rows:
+                found[key] = (tokens, np.frombuffer(blob, dtype=np.float32))
+        return found
+
+    def put_many(self, rows: list[tuple[str, int, np.ndarray]]):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+            [(key, tokens, np.asarray(vector, dtype=np.float32).tobytes()) for key, tokens, vector in rows]
+        )
+        self.conn.commit()
+
+
+def embed_texts(voyage, cache: EmbeddingCache, texts: list[str], input_type: str) -> tuple[np.ndarray, dict]:
+    """Embed through the cache. Returns the vectors and {"tokens", "new_tokens", "api_calls"} for this call."""
+    keys = [EmbeddingCache.key(EMBEDDING_MODEL, input_type, t) for t in texts]
+    cached = cache.get_many(list(set(keys)))
+    missing = list(dict.fromkeys(k for k in keys if k not in cached))
+    text_for = dict(zip(keys, texts))
+    stats = {"tokens": 0, "new_tokens": 0, "api_calls": 0}
+
+    for start in range(0, len(missing), BATCH_SIZE):
+        batch = missing[start:start + BATCH_SIZE]
+        result = voyage.embed([text_for[k] for k in batch], model=EMBEDDING_MODEL, input_type=input_type)
+        stats["api_calls"] += 1
+        stats["new_tokens"] += result.total_tokens
+        # Voyage reports tokens per request; spread them by length to cost each text
+        lengths = [len(text_for[k]) for k in batch]
+        rows = []
+        for key, length, vector in zip(batch, lengths, result.embeddings):
+            tokens = round(result.total_tokens * length / max(sum(lengths), 1))
+            rows.append((key, tokens, vector))
+            cached[key] = (tokens, np.asarray(vector, dtype=np.float32))
+        cache.put_many(rows)
+        print(f"  embedded {min(start + BATCH_SIZE, len(missing))}/{len(missing)} new {input_type} texts")
+
+    stats["tokens"] = sum(cached[k][0] for k in keys)
+    return np.vstack([cached[k][1] for k in keys]), stats
+
+
+# --- evaluation ---
+
+def chunk_corpus(transcripts: list[dict], strategy: str, size: int, overlap: int) -> list[dict]:
+    chunk_fn = chunker.STRATEGIES[strategy]
+    chunks = []
+    for t in transcripts:
+        for i, text in enumerate(chunk_fn(t["body"], size, overlap)):
+            chunks.append({"episode": t["episode"], "guest": t["guest"], "chunk_index": i, "text": text})
+    return chunks
+
+
+def index_bytes(index_dir: str) -> dict[str, int]:
+    return {name: os.path.getsize(os.path.join(index_dir, name)) for name in os.listdir(index_dir)}
+
+
+def evaluate(setting: str, transcripts, questions, query_vectors, voyage, cache, quantisation: str) -> dict:
+    strategy, size, overlap = setting.split(":")
+    chunks = chunk_corpus(transcripts, strategy, int(size), int(overlap))
+    print(f"\n{setting}: {len(chunks)} chunks")
+    vectors, embed_stats = embed_texts(voyage, cache, [c["text"] for c in chunks], "document")
+
+    top_k = max(K_VALUES)
+    hits = {"unfiltered": {k: 0 for k in K_VALUES}, "episode_filter": {k: 0 for k in K_VALUES}}
+    latencies = []
+    with tempfile.TemporaryDirectory() as index_dir:
+        ids = [chunker.chunk_id(c) for c in chunks]
+        metadata = [{"episode": c["episode"]} for c in chunks]
+        LocalVectorIndex.save(ids, vectors, metadata, index_dir, quantisation)
+        sizes = index_bytes(index_dir)
+        index = LocalVectorIndex.load(index_dir)
+        chunk_for = dict(zip(ids, chunks))
+
+        for question, vector in zip(questions, query_vectors):
+            for mode, query_filter in (("unfiltered", None), ("episode_filter", {"episode": {"$eq": question["episode"]}})):
+                start = time.perf_counter()
+                matches = index.query(vector, top_k=top_k, filter=query_filter).matches
+                latencies.append(time.perf_counter() - start)
+                ranks = [i for i, m in enumerate(matches) if is_answer(chunk_for[m.id], question)]
+                for k in K_VALUES:
+                    hits[mode][k] += bool(ranks) and ranks[0] < k
+        del index
+
+    lengths = [len(c["text"]) for c in chunks]
+    return {
+        "setting": setting,
+        "chunks": len(chunks),
+        "mean_chunk_chars": round(sum(lengths) / max(len(lengths), 1)),
+        "corpus_chars": sum(len(t["body"]) for t in transcripts),
+        "chunked_chars": sum(lengths),
+        "embedding_tokens": embed_stats["tokens"],
+        "new_embedding_tokens": embed_stats["new_tokens"],
+        "index_bytes": sum(sizes.values()),
+        "vector_bytes": sizes.get("vectors.f32", 0),
+        "code_bytes": sizes.get("codes.npy", 0),
+        "recall": {mode: {str(k): round(n / max(len(questions), 1), 3) for k, n in counts.items()}
+                   for mode, counts in hits.items()},
+        "query_p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "query_p95_ms": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+    }
+
+
+def print_report(results: list[dict]):
+    header = f"\n{'setting':<24}{'chunks':>8}{'chars/chunk':>12}{'emb tokens':>12}{'index MiB':>11}"
+    header += "".join(f"{f'R@{k}':>7}" for k in K_VALUES) + "".join(f"{f'fR@{k}':>7}" for k in K_VALUES)
+    header += f"{'p50 ms':>9}{'p95 ms':>9}"
+    print(header)
+    for r in results:
+        row = f"{r['setting']:<24}{r['chunks']:>8}{r['mean_chunk_chars']:>12}{r['embedding_tokens']:>12}"
+        row += f"{r['index_bytes'] / 2**20:>11.2f}"
+        row += "".join(f"{r['recall']['unfiltered'][str(k)]:>7.2f}" for k in K_VALUES)
+        row += "".join(f"{r['recall']['episode_filter'][str(k)]:>7.2f}" for k in K_VALUES)
+        row += f"{r['query_p50_ms']:>9.2f}{r['query_p95_ms']:>9.2f}"
+        print(row)
+    print("\nR@k: unfiltered recall; fR@k: recall within the guest's episode, as the retriever queries when it finds one")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", default=",".join(DEFAULT_GRID), help="comma-separated strategy:size:overlap")
+    parser.add_argument("--cleaned-dir", default=CLEANED_DIR)
+    parser.add_argument("--questions", help="hand-labelled JSONL instead of questions built from the CSV")
+    parser.add_argument("--max-questions", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quantisation", default="int8", choices=["int8", "binary"])
+    parser.add_argument("--cache", default=CACHE_FILE)
+    parser.add_argument("--standins", action="store_true",
+                        help="embed with the deterministic stand-in (checks the plumbing; recall is meaningless)")
+    parser.add_argument("--json", help="also write the results to this path")
+    args = parser.parse_args()
+
+    grid = [s.strip() for s in args.grid.split(",") if s.strip()]
+    for setting in grid:
+        if setting.split(":")[0] not in chunker.STRATEGIES or len(setting.split(":")) != 3:
+            parser.error(f"bad grid entry {setting!r}; expected one of {sorted(chunker.STRATEGIES)}:size:overlap")
+        try:
+            chunker.check_window(int(setting.split(":")[1]), int(setting.split(":")[2]))
+        except ValueError as e:
+            parser.error(f"bad grid entry {setting!r}: {e}")
+
+    if not os.path.isdir(args.cleaned_dir):
+        sys.exit(f"No cleaned transcripts at {args.cleaned_dir}; run pipeline/cleaner.py first")
+    transcripts = load_transcripts(args.cleaned_dir)
+    if args.questions:
+        questions = load_questions(args.questions)
+    else:
+        questions = build_questions(CSV_FILE, transcripts, args.max_questions, args.seed)
+    print(f"Corpus: {len(transcripts)} transcripts, {len(questions)} labelled questions")
+
+    if args.standins:
+        from benchmarks.standins import Latency, StandInVoyage
+        voyage = StandInVoyage(Latency(0.0))
+    else:
+        voyage = replay.wrap("voyage", lambda: voyageai.Client(api_key=os.getenv("VOYAGE_API_KEY")))
+    cache = EmbeddingCache(args.cache)
+
+    query_vectors, _ = embed_texts(voyage, cache, [q["question"] for q in questions], "query")
+    results = [evaluate(s, transcripts, questions, query_vectors, voyage, cache, args.quantisation) for s in grid]
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"questions": len(questions), "quantisation": args.quantisation, "results": results}, f, indent=2)
+        print(f"\nSaved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
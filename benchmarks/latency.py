@@ -0,0 +1,162 @@
+"""Offline latency benchmark for the question-answering path.
+
+Replays a versioned question corpus through get_route, answer_from_csv and ask with
+the Anthropic, Voyage and Pinecone clients replaced by local stand-ins, so timings
+reflect our own code plus whatever provider latency is injected on the command line.
+
+    python -m benchmarks.latency --iterations 5 --anthropic-ms 600 --voyage-ms 80 --pinecone-ms 40
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from benchmarks import standins
+
+# the stand-ins time provider calls per thread, and a batched embed runs on the batcher's thread
+os.environ.setdefault("OFFMENU_EMBED_BATCH_WINDOW_MS", "0")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = os.path.join(BASE_DIR, "benchmarks", "questions_v1.jsonl")
+PERCENTILES = (50, 95, 99)
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    # nearest-rank, so small samples still report an observed value
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def run_question(question: str, modules) -> list[tuple[str, float, float]]:
+    """Answer one question the way app.py does; returns (stage, wall, provider) timings."""
+    router, csv_answerer, retriever = modules
+    timings = []
+
+    def timed(stage, fn, *args):
+        standins.clock.reset()
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append((stage, time.perf_counter() - start, standins.clock.total))
+        return result
+
+    route = timed("get_route", router.get_route, question)
+    if route == "csv":
+        timed("answer_from_csv", csv_answerer.answer_from_csv, question)
+    elif route == "meta":
+        timed("answer_meta", csv_answerer.answer_meta)
+    else:
+        timed("find_episode_filter", retriever.find_episode_filter, question)
+        timed("ask", retriever.ask, question)
+
+    wall = sum(t[1] for t in timings)
+    provider = sum(t[2] for t in timings)
+    timings.append(("end_to_end", wall, provider))
+    return timings
+
+
+def measure_latency(corpus, modules, iterations: int) -> dict[str, dict[str, list[float]]]:
+    samples = {}
+    for _ in range(iterations):
+        for item in corpus:
+            for stage, wall, provider in run_question(item["question"], modules):
+                stage_samples = samples.setdefault(stage, {"wall": [], "provider": [], "own": []})
+                stage_samples["wall"].append(wall)
+                stage_samples["provider"].append(provider)
+                stage_samples["own"].append(wall - provider)
+    return samples
+
+
+def measure_allocations(corpus, modules) -> dict[str, list[int]]:
+    # separate pass: tracemalloc slows everything down and would skew the latency numbers
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for item in corpus:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            run_question(item["question"], modules)
+            peak = tracemalloc.get_traced_memory()[1]
+            peaks.setdefault(item["route"], []).append(peak - before)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def summarise(samples, peaks) -> dict:
+    report = {"stages": {}, "allocations": {}}
+    for stage, kinds in samples.items():
+        report["stages"][stage] = {
+            "count": len(kinds["wall"]),
+            **{
+                f"{kind}_p{p}_ms": round(percentile(values, p) * 1000, 3)
+                for kind, values in kinds.items()
+                for p in PERCENTILES
+            },
+        }
+    for route, values in peaks.items():
+        report["allocations"][route] = {
+            f"peak_p{p}_kib": round(percentile(values, p) / 1024, 1) for p in PERCENTILES
+        }
+    return report
+
+
+def print_report(report):
+    print(f"\n{'stage':<22}{'n':>6}" + "".join(f"{f'p{p} ms':>12}" for p in PERCENTILES)
+          + "".join(f"{f'own p{p}':>12}" for p in PERCENTILES))
+    for stage, stats in report["stages"].items():
+        row = f"{stage:<22}{stats['count']:>6}"
+        row += "".join(f"{stats[f'wall_p{p}_ms']:>12.2f}" for p in PERCENTILES)
+        row += "".join(f"{stats[f'own_p{p}_ms']:>12.2f}" for p in PERCENTILES)
+        print(row)
+
+    print(f"\n{'route':<22}" + "".join(f"{f'peak p{p} KiB':>16}" for p in PERCENTILES))
+    for route, stats in report["allocations"].items():
+        print(f"{route:<22}" + "".join(f"{stats[f'peak_p{p}_kib']:>16.1f}" for p in PERCENTILES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--anthropic-ms", type=float, default=0.0)
+    parser.add_argument("--voyage-ms", type=float, default=0.0)
+    parser.add_argument("--pinecone-ms", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative jitter, e.g. 0.2 for ±20%%")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this path")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    routes = {item["question"]: item["route"] for item in corpus}
+    standins.install(routes, args.anthropic_ms, args.voyage_ms, args.pinecone_ms, args.jitter, args.seed)
+
+    # imported only after the stand-ins are in place
+    from offmenu import csv_answerer, retriever, router
+    modules = (router, csv_answerer, retriever)
+
+    print(f"Corpus: {os.path.basename(args.corpus)} ({len(corpus)} questions)")
+    measure_latency(corpus, modules, args.warmup)
+    samples = measure_latency(corpus, modules, args.iterations)
+    peaks = measure_allocations(corpus, modules)
+
+    report = summarise(samples, peaks)
+    report["corpus"] = os.path.basename(args.corpus)
+    report["config"] = {k: v for k, v in vars(args).items() if k not in ("corpus", "json")}
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved report to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
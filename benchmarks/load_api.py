@@ -0,0 +1,98 @@
+"""Local load test for the offmenu.api service.
+
+Either point it at a running server:
+    python -m benchmarks.load_api --url http://localhost:8000 --requests 500 --concurrency 50
+or let it start one in-process on top of the provider stand-ins:
+    python -m benchmarks.load_api --standins --anthropic-ms 600 --voyage-ms 80 --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+
+from benchmarks import standins
+from benchmarks.latency import DEFAULT_CORPUS, PERCENTILES, load_corpus, percentile
+
+
+def start_standin_server(port: int, args, routes) -> str:
+    standins.install(routes, args.anthropic_ms, args.voyage_ms, args.pinecone_ms, args.jitter, args.seed)
+    os.environ.setdefault("OFFMENU_TRACE_LOG", "off")
+
+    import uvicorn
+    from offmenu.api import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+async def run_load(url: str, endpoint: str, questions: list[str], total: int, concurrency: int):
+    latencies, statuses = [], {}
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(questions[i % len(questions)])
+
+    async def worker(client):
+        while not queue.empty():
+            question = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                resp = await client.post(endpoint, json={"question": question})
+                await resp.aread()
+                status = resp.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url")
+    parser.add_argument("--standins", action="store_true", help="serve the API in-process on stand-in providers")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--endpoint", default="/ask")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--anthropic-ms", type=float, default=0.0)
+    parser.add_argument("--voyage-ms", type=float, default=0.0)
+    parser.add_argument("--pinecone-ms", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.url and not args.standins:
+        parser.error("pass --url or --standins")
+
+    corpus = load_corpus(args.corpus)
+    url = args.url
+    if args.standins:
+        url = start_standin_server(args.port, args, {item["question"]: item["route"] for item in corpus})
+
+    questions = [item["question"] for item in corpus]
+    latencies, statuses, elapsed = asyncio.run(
+        run_load(url, args.endpoint, questions, args.requests, args.concurrency)
+    )
+
+    print(f"{args.requests} requests to {url}{args.endpoint} at concurrency {args.concurrency}")
+    print(f"  wall time:  {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s)")
+    print(f"  statuses:   {statuses}")
+    for p in PERCENTILES:
+        print(f"  p{p}:        {percentile(latencies, p) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import asyncio
+import csv
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_FILE = os.path.join(BASE_DIR, "data", "menu_choices.csv")
+
+EMBEDDING_DIM = 512
+CHUNK_POOL_PER_EPISODE = 8
+CANNED_ANSWER = "This is a deterministic stand-in answer used for benchmarking."
+
+
+class ProviderClock:
+    """Accumulates time spent inside stand-in clients, per thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def reset(self):
+        self._local.total = 0.0
+
+    @property
+    def total(self) -> float:
+        return getattr(self._local, "total", 0.0)
+
+    def add(self, seconds: float):
+        self._local.total = self.total + seconds
+
+
+clock = ProviderClock()
+
+
+class Latency:
+    """Injected latency for one provider: a fixed base plus seeded jitter."""
+
+    def __init__(self, base_ms: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.base_ms = base_ms
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next_delay(self) -> float:
+        with self._lock:
+            factor = 1 + self._rng.uniform(-self.jitter, self.jitter)
+        return self.base_ms * factor / 1000
+
+    def sleep(self):
+        if self.base_ms > 0:
+            time.sleep(self.next_delay())
+
+    async def asleep(self):
+        if self.base_ms > 0:
+            await asyncio.sleep(self.next_delay())
+
+
+def _timed(fn):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            clock.add(time.perf_counter() - start)
+    return wrapper
+
+
+def _fake_vector(text: str) -> list[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vec = [rng.gauss(0, 1) for _ in range(EMBEDDING_DIM)]
+    norm = math.sqrt(sum(v * v for v in vec))
+    return [v / norm for v in vec]
+
+
+# --- Anthropic ---
+
+def _fake_message(model, messages, routes):
+    prompt = messages[-1]["content"]
+    if "routing assistant" in prompt:
+        question = prompt.rsplit("Question:", 1)[-1].strip()
+        text = routes.get(question, "unclear")
+    else:
+        text = CANNED_ANSWER
+    return SimpleNamespace(
+        model=model,
+        content=[SimpleNamespace(type="text", text=text)],
+        usage=SimpleNamespace(
+            input_tokens=len(prompt) // 4,
+            output_tokens=len(text) // 4,
+            cache_read_input_tokens=0,
+        ),
+    )
+
+
+class _Messages:
+    def __init__(self, owner):
+        self._owner = owner
+
+    @_timed
+    def create(self, model, max_tokens, messages, **kwargs):
+        self._owner.latency.sleep()
+        return _fake_message(model, messages, self._owner.routes)
+
+
+class StandInAnthropic:
+    def __init__(self, latency: Latency, routes: dict[str, str]):
+        self.latency = latency
+        self.routes = routes
+        self.messages = _Messages(self)
+
+
+class _AsyncStream:
+    def __init__(self, owner, message):
+        self._owner = owner
+        self._message = message
+
+    async def __aenter__(self):
+        await self._owner.latency.asleep()
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for word in self._message.content[0].text.split(" "):
+            yield word + " "
+
+    async def get_final_message(self):
+        return self._message
+
+
+class _AsyncMessages:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def create(self, model, max_tokens, messages, **kwargs):
+        await self._owner.latency.asleep()
+        return _fake_message(model, messages, self._owner.routes)
+
+    def stream(self, model, max_tokens, messages, **kwargs):
+        return _AsyncStream(self._owner, _fake_message(model, messages, self._owner.routes))
+
+
+class StandInAsyncAnthropic:
+    def __init__(self, latency: Latency, routes: dict[str, str]):
+        self.latency = latency
+        self.routes = routes
+        self.messages = _AsyncMessages(self)
+
+
+# --- Voyage ---
+
+class StandInVoyage:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    @_timed
+    def embed(self, texts, model=None, input_type=None, **kwargs):
+        self.latency.sleep()
+        return SimpleNamespace(
+            embeddings=[_fake_vector(t) for t in texts],
+            total_tokens=sum(len(t) // 4 for t in texts),
+        )
+
+
+class StandInAsyncVoyage:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    async def embed(self, texts, model=None, input_type=None, **kwargs):
+        await self.latency.asleep()
+        return SimpleNamespace(
+            embeddings=[_fake_vector(t) for t in texts],
+            total_tokens=sum(len(t) // 4 for t in texts),
+        )
+
+
+# --- Pinecone ---
+
+def _load_chunk_pool() -> list[dict]:
+    pool = []
+    with open(CSV_FILE, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            for i in range(CHUNK_POOL_PER_EPISODE):
+                text = f"Transcript excerpt {i} for {row['guest']}. " * 12
+                pool.append({"episode": row["episode"], "guest": row["guest"], "text": text[:500]})
+    return pool
+
+
+def _matches(metadata: dict, filter: dict) -> bool:
+    if "$or" in filter:
+        return any(_matches(metadata, f) for f in filter["$or"])
+    for field, condition in filter.items():
+        values = [condition["$eq"]] if "$eq" in condition else condition["$in"]
+        have = metadata.get(field, [metadata["episode"]] if field == "episodes" else None)
+        have = have if isinstance(have, list) else [have]
+        if not set(have) & set(values):
+            return False
+    return True
+
+
+class StandInIndex:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.pool = _load_chunk_pool()
+
+    @_timed
+    def query(self, vector, top_k, include_metadata=True, filter=None, **kwargs):
+        self.latency.sleep()
+        candidates = self.pool
+        if filter:
+            candidates = [c for c in candidates if _matches(c, filter)]
+        # rotate through the pool by a vector-derived offset so results vary per question
+        offset = int(abs(vector[0]) * 1_000_003) % max(len(candidates), 1)
+        picked = (candidates[offset:] + candidates[:offset])[:top_k]
+        matches = [
+            SimpleNamespace(id=f"ep{c['episode']}_chunk{i}", score=1.0 - i * 0.01, metadata=c)
+            for i, c in enumerate(picked)
+        ]
+        return SimpleNamespace(matches=matches)
+
+
+class StandInPinecone:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    def Index(self, name):
+        return StandInIndex(self.latency)
+
+    def has_index(self, name):
+        return True
+
+    def create_index(self, name, **kwargs):
+        return None
+
+
+def install(routes: dict[str, str], anthropic_ms=0.0, voyage_ms=0.0, pinecone_ms=0.0,
+            jitter=0.0, seed=0):
+    """Swap the provider SDK constructors for stand-ins.
+
+    Must run before any offmenu module is imported, since those build their clients at import time.
+    """
+    import anthropic
+    import pinecone
+    import voyageai
+
+    anthropic_latency = Latency(anthropic_ms, jitter, seed)
+    voyage_latency = Latency(voyage_ms, jitter, seed + 1)
+    pinecone_latency = Latency(pinecone_ms, jitter, seed + 2)
+
+    anthropic.Anthropic = lambda **kwargs: StandInAnthropic(anthropic_latency, routes)
+    anthropic.AsyncAnthropic = lambda **kwargs: StandInAsyncAnthropic(anthropic_latency, routes)
+    voyageai.Client = lambda **kwargs: StandInVoyage(voyage_latency)
+    voyageai.AsyncClient = lambda **kwargs: StandInAsyncVoyage(voyage_latency)
+    pinecone.Pinecone = lambda **kwargs: StandInPinecone(pinecone_latency)
@@ -0,0 +1,163 @@
+"""Headless ASGI service for the chatbot.
+
+    uvicorn offmenu.api:app --host 0.0.0.0 --port 8000 --workers 4
+
+Endpoints (all POST a JSON body of {"question": "..."}):
+    /route        -> {"route"}
+    /csv          -> {"answer"}
+    /rag          -> {"answer"}
+    /ask          -> {"route", "episode_filter", "answer"}, routed like app.py
+    /ask/stream   -> the answer as chunked text/plain, route in the X-Route header
+Add ?debug=1 to the JSON endpoints to get the request trace back as well.
+"""
+import asyncio
+import os
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from offmenu.chat import adispatch
+from offmenu.csv_answerer import aanswer_from_csv, answer_meta
+from offmenu.retriever import aask, astream_ask
+from offmenu.router import aget_route
+from offmenu.tracing import trace
+
+# max requests handled at once per worker; the rest wait up to QUEUE_TIMEOUT seconds, then get a 503
+MAX_CONCURRENCY = int(os.getenv("OFFMENU_MAX_CONCURRENCY", "32"))
+QUEUE_TIMEOUT = float(os.getenv("OFFMENU_QUEUE_TIMEOUT", "10"))
+
+_slots = asyncio.Semaphore(MAX_CONCURRENCY)
+
+
+class Overloaded(Exception):
+    pass
+
+
+async def acquire_slot():
+    try:
+        await asyncio.wait_for(_slots.acquire(), timeout=QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise Overloaded()
+
+
+def slot_releaser():
+    """Releases the caller's slot once, however many of the ways a request can end call it."""
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            _slots.release()
+    return release
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """A streaming response that gives back its slot when sending ends, even if the client disconnected
+    before the body was ever iterated (the body generator's own finally never runs then)."""
+
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+
+async def read_question(request: Request) -> str | None:
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    question = str(body.get("question", "")).strip() if isinstance(body, dict) else ""
+    return question or None
+
+
+def json_endpoint(name, handler):
+    async def endpoint(request: Request):
+        question = await read_question(request)
+        if question is None:
+            return JSONResponse({"error": "expected a JSON body with a non-empty 'question'"}, status_code=400)
+        try:
+            await acquire_slot()
+        except Overloaded:
+            return JSONResponse({"error": "server busy, try again"}, status_code=503)
+        try:
+            with trace(f"api.{name}", question=question) as request_trace:
+                payload = await handler(question, request_trace)
+        finally:
+            _slots.release()
+        if request.query_params.get("debug"):
+            payload["trace"] = request_trace.to_dict()
+        return JSONResponse(payload)
+    return endpoint
+
+
+async def handle_route(question, request_trace):
+    return {"route": await aget_route(question)}
+
+
+async def handle_csv(question, request_trace):
+    return {"answer": await aanswer_from_csv(question)}
+
+
+async def handle_rag(question, request_trace):
+    return {"answer": await aask(question)}
+
+
+async def handle_ask(question, request_trace):
+    route = await aget_route(question)
+    request_trace.set(route=route)
+    episode_filter, text = await adispatch(question, route)
+    return {"route": route, "episode_filter": episode_filter, "answer": text}
+
+
+async def ask_stream(request: Request):
+    question = await read_question(request)
+    if question is None:
+        return JSONResponse({"error": "expected a JSON body with a non-empty 'question'"}, status_code=400)
+    try:
+        await acquire_slot()
+    except Overloaded:
+        return JSONResponse({"error": "server busy, try again"}, status_code=503)
+
+    release = slot_releaser()
+    try:
+        route = await aget_route(question)
+    except Exception:
+        release()
+        raise
+
+    async def body():
+        try:
+            with trace("api.ask_stream", question=question, route=route):
+                if route == "csv":
+                    yield await aanswer_from_csv(question)
+                elif route == "meta":
+                    yield await asyncio.to_thread(answer_meta)
+                else:
+                    async for text in astream_ask(question, route):
+                        yield text
+        finally:
+            release()
+
+    return SlotStreamingResponse(body(), release, media_type="text/plain; charset=utf-8", headers={"X-Route": route})
+
+
+async def health(request: Request):
+    return JSONResponse({"status": "ok", "max_concurrency": MAX_CONCURRENCY})
+
+
+app = Starlette(routes=[
+    Route("/health", health, methods=["GET"]),
+    Route("/route", json_endpoint("route", handle_route), methods=["POST"]),
+    Route("/csv", json_endpoint("csv", handle_csv), methods=["POST"]),
+    Route("/rag", json_endpoint("rag", handle_rag), methods=["POST"]),
+    Route("/ask", json_endpoint("ask", handle_ask), methods=["POST"]),
+    Route("/ask/stream", ask_stream, methods=["POST"]),
+])
@@ -0,0 +1,103 @@
+"""Answer a file of evaluation questions concurrently and write the results as JSONL.
+
+    python -m offmenu.batch eval/questions.txt -o eval/results.jsonl --concurrency 16
+
+Input is either plain text (one question per line) or JSONL with a "question" field.
+Duplicate questions (ignoring case and whitespace) are answered once.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+# one JSON trace line per question would drown the progress output
+os.environ.setdefault("OFFMENU_TRACE_LOG", "off")
+
+from offmenu.chat import adispatch
+from offmenu.router import aget_route
+from offmenu.tracing import trace
+
+
+def read_questions(path: str) -> list[str]:
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                line = json.loads(line)["question"].strip()
+            questions.append(line)
+    return questions
+
+
+def dedupe(questions: list[str]) -> list[str]:
+    seen = set()
+    unique = []
+    for q in questions:
+        key = " ".join(q.lower().split())
+        if key not in seen:
+            seen.add(key)
+            unique.append(q)
+    return unique
+
+
+async def answer_one(index: int, question: str, slots: asyncio.Semaphore) -> dict:
+    async with slots:
+        start = time.perf_counter()
+        result = {"index": index, "question": question, "route": None, "episode_filter": None}
+        try:
+            with trace("batch", question=question) as request_trace:
+                route = await aget_route(question)
+                result["route"] = route
+                result["episode_filter"], result["answer"] = await adispatch(question, route)
+        except Exception as e:
+            result["error"] = repr(e)
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        result["tokens"] = request_trace.tokens()
+        # which model answered, so tiering savings can be weighed against answer quality
+        answer_spans = [s for s in request_trace.spans if s.name == "llm.answer"]
+        if answer_spans:
+            result["model"] = answer_spans[-1].attrs.get("model")
+            result["tier"] = answer_spans[-1].attrs.get("tier")
+        return result
+
+
+async def run(questions: list[str], output_file: str, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.create_task(answer_one(i, q, slots)) for i, q in enumerate(questions)]
+    failed = 0
+
+    # write each result as soon as it lands so an interrupted run keeps what it has
+    with open(output_file, "w", encoding="utf-8") as f:
+        for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+            result = await task
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            f.flush()
+            status = "✗ " + result["error"] if "error" in result else f"✓ {result['route']}"
+            failed += "error" in result
+            print(f"[{done}/{len(tasks)}] {result['latency_ms']:>8.0f} ms  {status}  {result['question']}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions_file")
+    parser.add_argument("-o", "--output", default="results.jsonl")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    questions = read_questions(args.questions_file)
+    unique = dedupe(questions)
+    print(f"Loaded {len(questions)} questions ({len(unique)} unique)\n")
+
+    start = time.perf_counter()
+    failed = asyncio.run(run(unique, args.output, args.concurrency))
+    elapsed = time.perf_counter() - start
+
+    print(f"\nDone in {elapsed:.1f}s, {failed} failed. Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import asyncio
+
+from offmenu.csv_answerer import aanswer_from_csv, answer_meta
+from offmenu.retriever import aask, find_episode_filter
+
+
+async def adispatch(question: str, route: str) -> tuple[str | None, str]:
+    """Answer an already-routed question the same way app.py does. Returns (episode_filter, answer)."""
+    if route == "csv":
+        return None, await aanswer_from_csv(question)
+    if route == "meta":
+        return None, await asyncio.to_thread(answer_meta)
+    episode_filter = find_episode_filter(question)
+    return episode_filter, await aask(question, route)
+
@@ -0,0 +1,53 @@
+import json
+import mmap
+import os
+import threading
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# written by pipeline/chunker.py: UTF-8 texts back to back, and {chunk_id: [byte_offset, byte_length]}.
+# not in git; a host without them falls back to the texts Pinecone vectors carry in metadata
+STORE_FILE = os.path.join(BASE_DIR, "data", "chunk_texts.bin")
+STORE_INDEX_FILE = os.path.join(BASE_DIR, "data", "chunk_texts.idx.json")
+
+
+class ChunkStore:
+    """Read-only, memory-mapped view of the chunk texts, opened on first use."""
+
+    def __init__(self, store_file: str = STORE_FILE, index_file: str = STORE_INDEX_FILE):
+        self.store_file = store_file
+        self.index_file = index_file
+        self._offsets = None
+        self._view = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> bool:
+        with self._lock:
+            if self._offsets is None:
+                if not (os.path.exists(self.store_file) and os.path.exists(self.index_file)):
+                    self._offsets = {}
+                    return False
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    offsets = json.load(f)
+                with open(self.store_file, "rb") as f:
+                    # the mapping outlives the file handle
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(self.store_file) else b""
+                self._view = memoryview(mapped)
+                self._offsets = offsets
+        return bool(self._offsets)
+
+    def get(self, chunk_id: str) -> str | None:
+        if not self._open():
+            return None
+        entry = self._offsets.get(chunk_id)
+        if entry is None:
+            return None
+        offset, length = entry
+        # slicing the memoryview doesn't copy; decoding is the only copy made
+        return str(self._view[offset:offset + length], "utf-8")
+
+    def __len__(self) -> int:
+        self._open()
+        return len(self._offsets)
+
+
+chunk_store = ChunkStore()
@@ -1,7 +1,11 @@
 import os
+import re
+import asyncio
 import pandas as pd
 import anthropic
 from dotenv import load_dotenv
+from offmenu.tracing import span
+from offmenu import replay
 
 load_dotenv()
 
@@ -12,7 +16,14 @@ def get_secret(key: str) -> str:
     except Exception:
         return os.getenv(key)
     
-anthropic_client = anthropic.Anthropic(api_key=get_secret("ANTHROPIC_API_KEY"))
+anthropic_client = replay.wrap("anthropic", lambda: anthropic.Anthropic(api_key=get_secret("ANTHROPIC_API_KEY")))
+async_anthropic_client = replay.wrap(
+    "anthropic", lambda: anthropic.AsyncAnthropic(api_key=get_secret("ANTHROPIC_API_KEY")), is_async=True
+)
+
+ANSWER_MODEL = "claude-haiku-4-5-20251001"
+# "off" sends every CSV question to the LLM, even ones the data answers outright
+LOCAL_ANSWERS = os.getenv("OFFMENU_CSV_LOCAL_ANSWERS", "on").lower() != "off"
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CSV_FILE = os.path.join(BASE_DIR, "data", "menu_choices.csv")
@@ -22,6 +33,50 @@ MENU_COLUMNS = ["starter", "main", "dessert", "drink", "still_or_sparkling", "po
 CHRISTMAS_COLUMN = "christmas_dinner"
 ALL_CHOICE_COLUMNS = MENU_COLUMNS + [CHRISTMAS_COLUMN]
 
+COLUMN_LABELS = {
+    "starter": "starter",
+    "main": "main course",
+    "dessert": "dessert",
+    "drink": "drink",
+    "still_or_sparkling": "water",
+    "poppadoms_or_bread": "poppadoms or bread",
+    "side_dish": "side dish",
+    "christmas_dinner": "Christmas dinner",
+}
+# questions about what was chosen, as opposed to why, or what was said about it
+LOOKUP_QUESTION = re.compile(r"\b(what|which|who|has anyone|have any|did anyone|how many)\b", re.IGNORECASE)
+DISCUSSION_QUESTION = re.compile(
+    r"\b(why|how come|explain|describe|story|stories|said|say|says|talk|talked|think|feel|felt|reason|opinion|funny|favourite)\b",
+    re.IGNORECASE,
+)
+# a guest's own choices, asked directly: "what did X choose (as their starter)?"
+DIRECT_GUEST_QUESTION = re.compile(r"^\s*(what|which)\b", re.IGNORECASE)
+# ...as opposed to questions that name a guest to ask about someone else
+OTHER_GUESTS = re.compile(r"\b(same|also|else|other|others|like|similar|who|which guests?)\b", re.IGNORECASE)
+# the same keywords as find_target_column, but as whole words
+COLUMN_WORDS = {
+    r"starters?": "starter",
+    r"mains?|main courses?": "main",
+    r"desserts?|puddings?": "dessert",
+    r"drinks?|beverages?": "drink",
+    r"still|sparkling|water": "still_or_sparkling",
+    r"poppadoms?|bread": "poppadoms_or_bread",
+    r"christmas": "christmas_dinner",
+    r"sides?|side dish(es)?": "side_dish",
+}
+# words a value search picks up that say nothing about the dish
+SEARCH_FILLER = {
+    "you", "your", "his", "her", "him", "she", "they", "them", "with", "and", "about",
+    "order", "ordered", "had", "got", "get", "ate", "eat", "choose", "picks", "selected", "went",
+    "people", "someone", "anybody", "dish", "food",
+}
+MAX_LISTED = 25
+# columns whose values the shipped normalised CSV really has reduced to canonical names; the rest
+# still hold free-text descriptions ("prawn cocktail with Marie Rose sauce"), so counts over them
+# need the LLM to merge variants
+NORMALISED_COLUMNS = {"side_dish"}
+CLEAR_LEAD = 1.5   # a local "most common" answer needs the top value this many times the runner-up
+
 SYSTEM_PROMPT = """You are a knowledgeable assistant for the Off Menu podcast, hosted by Ed Gamble and James Acaster.
 You have been provided with structured data about guests' menu choices. Answer the question naturally and conversationally based on this data.
 If the data doesn't contain enough information to answer, say so clearly."""
@@ -98,8 +153,23 @@ def extract_search_terms(question: str) -> list[str]:
     return [w for w in words if w not in stopwords and len(w) > 2]
 
 
-def build_csv_context(question: str, df_raw: pd.DataFrame, df_norm: pd.DataFrame) -> str:
-    lines = []
+def guest_words(df: pd.DataFrame) -> set[str]:
+    """Lowercased words of every guest's name, for spotting a search term that is really a partial name."""
+    return {w for guest in df["guest"].dropna() for w in re.findall(r"[a-z]+", str(guest).lower()) if len(w) > 2}
+
+
+def fold_counts(counts: list[tuple]) -> list[tuple[str, int]]:
+    """Merge values that differ only in case or spacing, keeping the spelling seen most often."""
+    folded, shown = {}, {}
+    for value, count in counts:
+        key = " ".join(str(value).split()).lower()
+        folded[key] = folded.get(key, 0) + count
+        shown.setdefault(key, " ".join(str(value).split()))
+    return sorted(((shown[key], count) for key, count in folded.items()), key=lambda item: -item[1])
+
+
+def build_csv_result(question: str, df_raw: pd.DataFrame, df_norm: pd.DataFrame) -> dict:
+    """Look the question up in the CSVs. Returns a structured result whose "kind" says which path answered it."""
     q = question.lower()
 
     # --- PATH 1: Guest-specific lookup (use raw for full descriptive answer) ---
@@ -107,17 +177,14 @@ def build_csv_context(question: str, df_raw: pd.DataFrame, df_norm: pd.DataFrame
     if guest_match:
         row = df_raw[df_raw["guest"] == guest_match]
         if row.empty:
-            return f"No data found for guest: {guest_match}"
+            return {"kind": "no_guest_data", "guest": guest_match}
         row = row.iloc[0]
-        lines.append(f"Menu choices for {guest_match} (Episode {row.get('episode', 'unknown')}):")
-        for col in MENU_COLUMNS:
+        choices = {}
+        for col in ALL_CHOICE_COLUMNS:
             val = row.get(col)
             if pd.notna(val) and str(val).strip():
-                lines.append(f"  {col}: {val}")
-        christmas = row.get(CHRISTMAS_COLUMN)
-        if pd.notna(christmas) and str(christmas).strip():
-            lines.append(f"  christmas_dinner: {christmas}")
-        return "\n".join(lines)
+                choices[col] = val
+        return {"kind": "guest", "guest": guest_match, "episode": row.get("episode", "unknown"), "choices": choices}
 
     # --- PATH 2: Aggregation over a specific column (use normalised) ---
     aggregation_keywords = ["most common", "most popular", "how many", "which guests",
@@ -131,58 +198,225 @@ def build_csv_context(question: str, df_raw: pd.DataFrame, df_norm: pd.DataFrame
             col_data = col_data[col_data[target_col].str.strip() != ""]
 
         counts = col_data[target_col].value_counts()
-        lines.append(f"Value counts for '{target_col}' across {len(col_data)} guests:")
-        for value, count in counts.items():
-            lines.append(f"  {value}: {count}")
-        return "\n".join(lines)
+        return {"kind": "counts", "column": target_col, "total": len(col_data),
+                "counts": [(value, int(count)) for value, count in counts.items()]}
 
     # --- PATH 3: Value search across all columns (use normalised) ---
     search_terms = extract_search_terms(question)
     if search_terms:
         all_results = {}
+        matched_terms = []
         # try pairs of adjacent terms first
         for i in range(len(search_terms) - 1):
             phrase = f"{search_terms[i]} {search_terms[i+1]}"
             results = search_value_across_columns(phrase, df_norm)
             if results:
                 all_results.update(results)
+                matched_terms.append(phrase)
         # fall back to individual terms
         if not all_results:
             for term in search_terms:
                 results = search_value_across_columns(term, df_norm)
                 all_results.update(results)
+                if results:
+                    matched_terms.append(term)
 
         if all_results:
-            lines.append(f"Search results for question: '{question}'")
-            for col, matches in all_results.items():
-                lines.append(f"\nMatches in '{col}':")
-                for guest, value in matches:
-                    lines.append(f"  {guest}: {value}")
-            return "\n".join(lines)
-        else:
-            return f"No matches found across any menu column for the terms in: '{question}'"
+            return {"kind": "search", "terms": search_terms, "matched_terms": matched_terms, "matches": all_results,
+                    "guest_terms": sorted(set(search_terms) & guest_words(df_raw))}
+        return {"kind": "no_matches", "terms": search_terms}
 
     # --- FALLBACK ---
-    lines.append(f"Total guests in dataset: {len(df_norm)}")
-    lines.append("\nTop 5 most common choices per column:")
-    for col in MENU_COLUMNS:
-        counts = df_norm[col].dropna().value_counts().head(5)
-        lines.append(f"\n{col}:")
-        for value, count in counts.items():
+    return {
+        "kind": "overview",
+        "total": len(df_norm),
+        "top": {col: list(df_norm[col].dropna().value_counts().head(5).items()) for col in MENU_COLUMNS},
+    }
+
+
+def render_context(question: str, result: dict) -> str:
+    """The data block the LLM answers from."""
+    kind = result["kind"]
+    lines = []
+    if kind == "no_guest_data":
+        return f"No data found for guest: {result['guest']}"
+    if kind == "guest":
+        lines.append(f"Menu choices for {result['guest']} (Episode {result['episode']}):")
+        for col, val in result["choices"].items():
+            lines.append(f"  {col}: {val}")
+    elif kind == "counts":
+        lines.append(f"Value counts for '{result['column']}' across {result['total']} guests:")
+        for value, count in result["counts"]:
             lines.append(f"  {value}: {count}")
+    elif kind == "search":
+        lines.append(f"Search results for question: '{question}'")
+        for col, matches in result["matches"].items():
+            lines.append(f"\nMatches in '{col}':")
+            for guest, value in matches:
+                lines.append(f"  {guest}: {value}")
+    elif kind == "no_matches":
+        return f"No matches found across any menu column for the terms in: '{question}'"
+    else:
+        lines.append(f"Total guests in dataset: {result['total']}")
+        lines.append("\nTop 5 most common choices per column:")
+        for col, counts in result["top"].items():
+            lines.append(f"\n{col}:")
+            for value, count in counts:
+                lines.append(f"  {value}: {count}")
     return "\n".join(lines)
 
 
-def answer_from_csv(question: str) -> str:
-    df_raw, df_norm = load_csvs()
-    context = build_csv_context(question, df_raw, df_norm)
+def build_csv_context(question: str, df_raw: pd.DataFrame, df_norm: pd.DataFrame) -> str:
+    return render_context(question, build_csv_result(question, df_raw, df_norm))
+
+
+def mentioned_columns(question: str) -> list[str]:
+    columns = []
+    for pattern, col in COLUMN_WORDS.items():
+        if re.search(rf"\b({pattern})\b", question, re.IGNORECASE) and col not in columns:
+            columns.append(col)
+    return columns
+
+
+def render_answer(question: str, result: dict) -> str | None:
+    """A templated answer for results the data settles on its own; None when it needs the LLM's judgement."""
+    if not LOOKUP_QUESTION.search(question) or DISCUSSION_QUESTION.search(question):
+        return None
+    kind = result["kind"]
+    q = question.lower()
+
+    if kind == "guest":
+        if not DIRECT_GUEST_QUESTION.search(question) or OTHER_GUESTS.search(question):
+            return None
+        if re.search(rf"\bas\s+{re.escape(result['guest'].lower())}", q):
+            return None
+        choices = result["choices"]
+        columns = mentioned_columns(question)
+        if columns:
+            if not all(col in choices for col in columns):
+                return None
+            parts = [f"their {COLUMN_LABELS[col]} was {choices[col]}" for col in columns]
+            return f"For {result['guest']} (Episode {result['episode']}), {' and '.join(parts)}."
+        if not choices:
+            return None
+        lines = [f"{result['guest']}'s dream menu (Episode {result['episode']}):"]
+        lines += [f"- {COLUMN_LABELS[col].capitalize()}: {val}" for col, val in choices.items()]
+        return "\n".join(lines)
+
+    if kind == "counts":
+        if result["column"] not in NORMALISED_COLUMNS:
+            return None
+        label = COLUMN_LABELS[result["column"]]
+        counts = fold_counts(result["counts"])
+        if not counts:
+            return None
+        if "most common" in q or "most popular" in q:
+            top_value, top_count = counts[0]
+            next_count = counts[1][1] if len(counts) > 1 else 0
+            # a narrow lead or a tie is better explained than stated
+            if top_count < 2 or top_count < CLEAR_LEAD * next_count:
+                return None
+            runners_up = [f"{value} ({count})" for value, count in counts[1:3] if count > 1]
+            answer = f"The most common {label} is {top_value}, chosen by {top_count} of {result['total']} guests"
+            return answer + (f", followed by {' and '.join(runners_up)}." if runners_up else ".")
+        if "how many" in q:
+            # only when the question names one of the recorded values exactly
+            named = [(value, count) for value, count in counts if re.search(rf"\b{re.escape(value.lower())}\b", q)]
+            if len(named) == 1:
+                value, count = named[0]
+                return f"{count} of {result['total']} guests chose {value.lower()} as their {label}."
+        return None
+
+    if kind == "search":
+        # several unrelated words each matching something is a guess, not an answer,
+        # and so is a match that leaves other words in the question unexplained
+        if len(result["matched_terms"]) != 1:
+            return None
+        term = result["matched_terms"][0]
+        if any(w in SEARCH_FILLER for w in term.split()):
+            return None
+        if any(t not in SEARCH_FILLER and t not in term.split() for t in result["terms"]):
+            return None
+        # "james" is more likely a guest than an ingredient
+        if result.get("guest_terms"):
+            return None
+        hits = [(guest, col, value) for col, matches in result["matches"].items() for guest, value in matches]
+        # the search matches substrings; "cheese" finding cheesecake, or "ice cream" finding
+        # "slice cream", needs judgement, so answer only when every hit has the term as whole words
+        whole_words = re.compile(rf"\b{re.escape(term)}\b", re.IGNORECASE)
+        if not all(whole_words.search(str(value)) for _, _, value in hits):
+            return None
+        guests = list(dict.fromkeys(guest for guest, _, _ in hits))
+        summary = f"{len(guests)} guest{'s' if len(guests) != 1 else ''} chose something matching \"{term}\""
+        if "how many" in q:
+            return summary + "."
+        lines = [summary + ":"]
+        lines += [f"- {guest}: {value} ({COLUMN_LABELS[col]})" for guest, col, value in hits[:MAX_LISTED]]
+        if len(hits) > MAX_LISTED:
+            lines.append(f"…and {len(hits) - MAX_LISTED} more.")
+        return "\n".join(lines)
+
+    # no data, nothing matched, or a general overview: let the LLM explain
+    return None
+
+
+def csv_result(question: str) -> tuple[dict, str | None]:
+    """The structured lookup result and, when it settles the question, a ready answer."""
+    with span("csv.load"):
+        df_raw, df_norm = load_csvs()
+    with span("csv.lookup") as s:
+        result = build_csv_result(question, df_raw, df_norm)
+        local = render_answer(question, result) if LOCAL_ANSWERS else None
+        s.set(kind=result["kind"], local_answer=local is not None)
+    return result, local
+
 
-    response = anthropic_client.messages.create(
-        model="claude-haiku-4-5-20251001",
-        max_tokens=512,
-        messages=[{
+def csv_context(question: str) -> str:
+    result, _ = csv_result(question)
+    return render_context(question, result)
+
+
+def answer_request(question: str, context: str) -> dict:
+    return {
+        "model": ANSWER_MODEL,
+        "max_tokens": 512,
+        "messages": [{
             "role": "user",
             "content": f"{SYSTEM_PROMPT}\n\nData:\n{context}\n\nQuestion: {question}"
         }]
-    )
-    return response.content[0].text
\ No newline at end of file
+    }
+
+
+def answer_from_csv(question: str) -> str:
+    result, local = csv_result(question)
+    if local is not None:
+        return local
+    context = render_context(question, result)
+    with span("llm.answer", model=ANSWER_MODEL) as s:
+        response = anthropic_client.messages.create(**answer_request(question, context))
+        s.add_usage(response)
+    return response.content[0].text
+
+
+async def aanswer_from_csv(question: str) -> str:
+    # pandas work is blocking, keep it off the event loop
+    result, local = await asyncio.to_thread(csv_result, question)
+    if local is not None:
+        return local
+    context = render_context(question, result)
+    with span("llm.answer", model=ANSWER_MODEL) as s:
+        response = await async_anthropic_client.messages.create(**answer_request(question, context))
+        s.add_usage(response)
+    return response.content[0].text
+
+
+def answer_meta() -> str:
+    df = pd.read_csv(CSV_FILE)
+    episode_count = df["episode"].nunique()
+    guest_count = df["guest"].nunique()
+    return (
+        f"I'm an AI assistant built specifically for the Off Menu podcast, hosted by Ed Gamble "
+        f"and James Acaster. I have access to transcripts and menu choice data from {episode_count} "
+        f"episodes covering {guest_count} guests. You can ask me about what guests chose for their "
+        f"dream meal, patterns across episodes, or anything discussed in the show."
+    )
\ No newline at end of file
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
+
+from offmenu import replay
+
+# how long the first request of a batch waits for company; 0 sends every request on its own
+WINDOW_MS = float(os.getenv("OFFMENU_EMBED_BATCH_WINDOW_MS", "5"))
+MAX_BATCH = int(os.getenv("OFFMENU_EMBED_MAX_BATCH", "64"))
+MAX_IN_FLIGHT = 4   # batches sent concurrently, so one slow call doesn't hold up the next window
+# longest a caller waits for its batch before giving up on it
+EMBED_TIMEOUT = float(os.getenv("OFFMENU_EMBED_TIMEOUT", "30"))
+
+
+class EmbedBatcher:
+    """Coalesces embed calls from every thread and event loop in the process into batched requests.
+
+    Each caller still gets back a result shaped like a single-text embed() response: .embeddings
+    holds its one vector, and .total_tokens its length-weighted share of the batch's tokens.
+    """
+
+    def __init__(self, client, model: str, input_type: str = "query",
+                 window_ms: float = WINDOW_MS, max_batch: int = MAX_BATCH):
+        self.client = client
+        self.model = model
+        self.input_type = input_type
+        # recordings are keyed on the whole request, so batch composition would make replays miss
+        self.window = 0.0 if replay.MODE != "off" else window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._worker = None
+        self._senders = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._worker is None:
+                self._senders = ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT, thread_name_prefix="embed-batch")
+                self._worker = threading.Thread(target=self._collect, name="embed-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch):
+        # callers that gave up (a cancelled aembed) are dropped; the rest can no longer be cancelled
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        texts = [text for text, _ in batch]
+        try:
+            result = self.client.embed(texts, model=self.model, input_type=self.input_type)
+            if len(result.embeddings) != len(texts):
+                raise ValueError(f"expected {len(texts)} embeddings, got {len(result.embeddings)}")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        total_chars = max(sum(len(t) for t in texts), 1)
+        total_tokens = getattr(result, "total_tokens", 0) or 0
+        for (text, future), embedding in zip(batch, result.embeddings):
+            # one bad result mustn't leave the callers after it waiting
+            try:
+                future.set_result(SimpleNamespace(
+                    embeddings=[embedding],
+                    total_tokens=round(total_tokens * len(text) / total_chars),
+                    batch_size=len(batch)
+                ))
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _direct(self, text):
+        result = self.client.embed([text], model=self.model, input_type=self.input_type)
+        return SimpleNamespace(embeddings=result.embeddings, total_tokens=getattr(result, "total_tokens", 0), batch_size=1)
+
+    def submit(self, text: str) -> Future:
+        self._start()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str):
+        if self.window <= 0:
+            return self._direct(text)
+        future = self.submit(text)
+        try:
+            return future.result(timeout=EMBED_TIMEOUT)
+        except TimeoutError:
+            future.cancel()  # so a batch that hasn't gone out yet leaves it behind
+            raise
+
+    async def aembed(self, text: str):
+        if self.window <= 0:
+            return await asyncio.to_thread(self._direct, text)
+        return await asyncio.wait_for(asyncio.wrap_future(self.submit(text)), EMBED_TIMEOUT)
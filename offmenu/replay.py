@@ -0,0 +1,266 @@
+"""Record/replay for Anthropic, Voyage and Pinecone calls.
+
+Set OFFMENU_REPLAY to choose how wrapped clients behave:
+    off      (default) the real SDK client, untouched
+    record   call the provider and store every response
+    replay   answer only from the store; a call that was never recorded raises CassetteMiss
+    auto     replay what's stored, record what isn't
+
+Responses are keyed on the provider, the method and the full request content. They are
+stored zlib-compressed in a SQLite cassette file (OFFMENU_CASSETTE, default data/cassettes.sqlite).
+OFFMENU_REPLAY_LATENCY adds simulated latency on replay: a number of milliseconds, or
+"recorded" to wait as long as the original call took.
+
+In replay mode the real client is only built if a call isn't intercepted, so fully
+recorded runs need no keys and no network.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODE = os.getenv("OFFMENU_REPLAY", "off").lower()
+CASSETTE_FILE = os.getenv("OFFMENU_CASSETTE", os.path.join(BASE_DIR, "data", "cassettes.sqlite"))
+REPLAY_LATENCY = os.getenv("OFFMENU_REPLAY_LATENCY", "0")
+
+# methods whose responses are recorded, by provider; dotted paths are nested attributes
+INTERCEPT = {
+    "anthropic": {"messages.create", "messages.stream"},
+    "voyage": {"embed"},
+    # the index checks pipeline/embedder.py makes before it touches the index itself
+    "pinecone": {"has_index", "create_index"},
+    "pinecone.index": {"query", "upsert", "delete"},
+}
+# methods that hand back another client to wrap, e.g. Pinecone(...).Index(name)
+SUBCLIENTS = {
+    "pinecone": {"Index": "pinecone.index"},
+}
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+class Recorded(dict):
+    """A replayed response: a dict that also allows attribute access, like the SDK objects it stands in for."""
+
+    def __getattr__(self, name):
+        try:
+            return _revive(self[name])
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, name):
+        return _revive(dict.__getitem__(self, name))
+
+    def get(self, name, default=None):
+        return _revive(dict.get(self, name, default))
+
+
+def _revive(value):
+    if isinstance(value, dict) and not isinstance(value, Recorded):
+        return Recorded(value)
+    if isinstance(value, list):
+        return [_revive(v) for v in value]
+    return value
+
+
+def to_jsonable(obj):
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, dict):
+        return {str(k): to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_jsonable(v) for v in obj]
+    for method in ("model_dump", "to_dict"):
+        if callable(getattr(obj, method, None)):
+            return to_jsonable(getattr(obj, method)())
+    if hasattr(obj, "__dict__"):
+        return {k: to_jsonable(v) for k, v in vars(obj).items() if not k.startswith("_")}
+    return repr(obj)
+
+
+def request_key(family: str, method: str, args: tuple, kwargs: dict) -> str:
+    payload = json.dumps([family, method, to_jsonable(args), to_jsonable(kwargs)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CassetteStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS calls ("
+                "key TEXT PRIMARY KEY, family TEXT, method TEXT, latency_ms REAL, recorded_at REAL, response BLOB)"
+            )
+        return self._conn
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._connection().execute("SELECT response, latency_ms FROM calls WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return _revive(json.loads(zlib.decompress(row[0]))), row[1]
+
+    def put(self, key: str, family: str, method: str, response, latency_ms: float):
+        blob = zlib.compress(json.dumps(to_jsonable(response), ensure_ascii=False).encode("utf-8"), 6)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO calls VALUES (?, ?, ?, ?, ?, ?)",
+                (key, family, method, latency_ms, time.time(), blob)
+            )
+            conn.commit()
+
+
+store = CassetteStore(CASSETTE_FILE)
+
+
+def replay_delay(recorded_ms: float) -> float:
+    if REPLAY_LATENCY == "recorded":
+        return recorded_ms / 1000
+    return float(REPLAY_LATENCY) / 1000
+
+
+class _Proxy:
+    def __init__(self, provider, family, resolve, is_async, path=""):
+        self._provider = provider
+        self._family = family
+        self._resolve = resolve
+        self._is_async = is_async
+        self._path = path
+
+    def _real(self, full):
+        obj = self._resolve()
+        for part in full.split("."):
+            obj = getattr(obj, part)
+        return obj
+
+    def __getattr__(self, name):
+        full = self._path + name
+        intercepted = INTERCEPT.get(self._provider, set())
+
+        if full in SUBCLIENTS.get(self._provider, {}):
+            sub_provider = SUBCLIENTS[self._provider][full]
+
+            def make_subclient(*args, **kwargs):
+                family = f"{sub_provider}({json.dumps(to_jsonable([args, kwargs]), sort_keys=True)})"
+                holder = {}
+
+                def resolve():
+                    if "client" not in holder:
+                        holder["client"] = self._real(full)(*args, **kwargs)
+                    return holder["client"]
+                return _Proxy(sub_provider, family, resolve, self._is_async)
+            return make_subclient
+
+        if full == "messages.stream" and full in intercepted:
+            return lambda **kwargs: _Stream(self, kwargs)
+        if full in intercepted:
+            return self._acall(full) if self._is_async else self._call(full)
+        if any(m.startswith(full + ".") for m in intercepted):
+            return _Proxy(self._provider, self._family, self._resolve, self._is_async, full + ".")
+        return self._real(full)
+
+    def _lookup(self, method, args, kwargs):
+        key = request_key(self._family, method, args, kwargs)
+        hit = store.get(key) if MODE in ("replay", "auto") else None
+        if hit is None and MODE == "replay":
+            raise CassetteMiss(f"no recording for {self._family} {method}")
+        return key, hit
+
+    def _call(self, method):
+        def call(*args, **kwargs):
+            key, hit = self._lookup(method, args, kwargs)
+            if hit is not None:
+                time.sleep(replay_delay(hit[1]))
+                return hit[0]
+            start = time.perf_counter()
+            response = self._real(method)(*args, **kwargs)
+            store.put(key, self._family, method, response, (time.perf_counter() - start) * 1000)
+            return response
+        return call
+
+    def _acall(self, method):
+        async def call(*args, **kwargs):
+            key, hit = self._lookup(method, args, kwargs)
+            if hit is not None:
+                await asyncio.sleep(replay_delay(hit[1]))
+                return hit[0]
+            start = time.perf_counter()
+            response = await self._real(method)(*args, **kwargs)
+            store.put(key, self._family, method, response, (time.perf_counter() - start) * 1000)
+            return response
+        return call
+
+
+class _Stream:
+    """Async stand-in for messages.stream(). Shares recordings with messages.create, since the final message is the same."""
+
+    def __init__(self, proxy: _Proxy, kwargs: dict):
+        self._proxy = proxy
+        self._kwargs = kwargs
+        self._message = None
+        self._live = None
+        self._stream = None
+
+    async def __aenter__(self):
+        self._key, hit = self._proxy._lookup("messages.create", (), self._kwargs)
+        if hit is not None:
+            await asyncio.sleep(replay_delay(hit[1]))
+            self._message = hit[0]
+            return self
+        self._start = time.perf_counter()
+        self._live = self._proxy._real("messages.stream")(**self._kwargs)
+        self._stream = await self._live.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._live is None:
+            return False
+        if exc[0] is None:
+            message = await self._stream.get_final_message()
+            latency_ms = (time.perf_counter() - self._start) * 1000
+            store.put(self._key, self._proxy._family, "messages.create", message, latency_ms)
+        return await self._live.__aexit__(*exc)
+
+    @property
+    def text_stream(self):
+        if self._message is None:
+            return self._stream.text_stream
+        return self._replayed_text()
+
+    async def _replayed_text(self):
+        for block in self._message.content:
+            if block.get("type") == "text":
+                yield block["text"]
+
+    async def get_final_message(self):
+        if self._message is None:
+            return await self._stream.get_final_message()
+        return self._message
+
+
+def wrap(provider: str, factory, is_async: bool = False):
+    """Build a provider client through the record/replay layer. With OFFMENU_REPLAY=off this is just factory()."""
+    if MODE == "off":
+        return factory()
+    holder = {}
+
+    def resolve():
+        if "client" not in holder:
+            holder["client"] = factory()
+        return holder["client"]
+    return _Proxy(provider, provider, resolve, is_async)
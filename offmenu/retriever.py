@@ -1,14 +1,29 @@
 import os
+import re
+import csv
+import asyncio
+import logging
+import threading
 import voyageai
 from pinecone import Pinecone
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 from dotenv import load_dotenv
+from offmenu.tracing import span
+from offmenu import replay
+from offmenu.chunk_store import chunk_store
+from offmenu.tiering import TIERS, choose_tier
+from offmenu.summaries import summary_index
+from offmenu.embed_batcher import EmbedBatcher
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 PINECONE_INDEX = "offmenu"
 EMBEDDING_MODEL = "voyage-3-lite"
 TOP_K = 10  # number of chunks to retrieve
+SUMMARY_EPISODES = 5     # episodes picked from the summary index for broad questions
+CHUNKS_PER_EPISODE = 2   # chunks kept from each of those episodes
 
 def get_secret(key: str) -> str:
     try:
@@ -17,66 +32,192 @@ def get_secret(key: str) -> str:
     except Exception:
         return os.getenv(key)
     
-voyage = voyageai.Client(api_key=get_secret("VOYAGE_API_KEY"))
-pc = Pinecone(api_key=get_secret("PINECONE_API_KEY"))
-index = pc.Index(PINECONE_INDEX)
-anthropic = Anthropic(api_key=get_secret("ANTHROPIC_API_KEY"))
+voyage = replay.wrap("voyage", lambda: voyageai.Client(api_key=get_secret("VOYAGE_API_KEY")))
+# one per process: concurrent sessions' questions go to Voyage together
+query_embedder = EmbedBatcher(voyage, EMBEDDING_MODEL, input_type="query")
+# "pinecone" or "local" (the quantised index pipeline/embedder.py writes to data/index)
+VECTOR_BACKEND = get_secret("OFFMENU_VECTOR_BACKEND") or "pinecone"
+
+if VECTOR_BACKEND == "local":
+    from offmenu.vector_index import LocalVectorIndex
+    index = LocalVectorIndex.load()
+else:
+    pc = replay.wrap("pinecone", lambda: Pinecone(api_key=get_secret("PINECONE_API_KEY")))
+    index = pc.Index(PINECONE_INDEX)
+# two-level retrieval through per-episode summaries: "auto" for broad questions, "always", or "off"
+HIERARCHICAL = (get_secret("OFFMENU_HIERARCHICAL") or "auto").lower()
+# questions about the feel of episodes rather than a detail in one of them. summaries leave details out,
+# so "has anyone ever mentioned X?" stays on the flat search, which looks at every episode
+BROAD_QUESTION = re.compile(
+    r"\b(vibes?|overall|in general|generally|summar\w*|themes?|trends?|patterns?|tone|mood|"
+    r"across (the )?episodes|compare|comparison)\b",
+    re.IGNORECASE,
+)
+anthropic = replay.wrap("anthropic", lambda: Anthropic(api_key=get_secret("ANTHROPIC_API_KEY")))
+async_anthropic = replay.wrap(
+    "anthropic", lambda: AsyncAnthropic(api_key=get_secret("ANTHROPIC_API_KEY")), is_async=True
+)
     
+_guest_episodes = None
+_guest_lock = threading.Lock()
+
+def guest_episodes():
+    # read once per process; the async paths call find_episode_filter on the event loop
+    global _guest_episodes
+    with _guest_lock:
+        if _guest_episodes is None:
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            csv_path = os.path.join(base_dir, "data", "menu_choices.csv")
+            lookup = {}
+            with open(csv_path, "r", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    guest = row["guest"].strip().lower()
+                    lookup[guest] = row["episode"]
+            _guest_episodes = lookup
+    return _guest_episodes
+
 def find_episode_filter(question):
-    import csv
-    import os
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    csv_path = os.path.join(base_dir, "data", "menu_choices.csv")
-    
-    lookup = {}
-    with open(csv_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            guest = row["guest"].strip().lower()
-            lookup[guest] = row["episode"]
-    
-    question_lower = question.lower()
-    for guest, episode in lookup.items():
-        if guest in question_lower:
-            return episode
+    with span("find_episode_filter") as s:
+        question_lower = question.lower()
+        for guest, episode in guest_episodes().items():
+            if guest in question_lower:
+                s.set(episode=episode)
+                return episode
     
     return None
 
-def retrieve(question):
-    episode_filter = find_episode_filter(question)
+def episode_clause(episode):
+    # deduplicated chunks list every episode they appear in; vectors from before that only have "episode"
+    return {"$or": [{"episode": {"$eq": episode}}, {"episodes": {"$in": [episode]}}]}
 
-    result = voyage.embed([question], model=EMBEDDING_MODEL, input_type="query")
-    query_embedding = result.embeddings[0]
-
-    if episode_filter:
-        print(f"(Filtering to episode {episode_filter})")
-        results = index.query(
-            vector=query_embedding,
-            top_k=20,
-            include_metadata=True,
-            filter={"episode": {"$eq": episode_filter}}
-        )
-    else:
-        results = index.query(
-            vector=query_embedding,
-            top_k=TOP_K,
-            include_metadata=True
-        )
+def query_index(query_embedding, episode_filter, episodes=None):
+    with span("index.query") as s:
+        if episodes:
+            # spread the hits across the chosen episodes instead of letting one dominate
+            results = index.query(
+                vector=query_embedding,
+                top_k=len(episodes) * CHUNKS_PER_EPISODE * 3,
+                include_metadata=True,
+                filter={"$or": [{"episode": {"$in": episodes}}, {"episodes": {"$in": episodes}}]}
+            )
+            per_episode = {}
+            matches = []
+            for match in results.matches:
+                ep = match.metadata["episode"]
+                if per_episode.get(ep, 0) < CHUNKS_PER_EPISODE:
+                    per_episode[ep] = per_episode.get(ep, 0) + 1
+                    matches.append(match)
+        elif episode_filter:
+            results = index.query(
+                vector=query_embedding,
+                top_k=20,
+                include_metadata=True,
+                filter=episode_clause(episode_filter)
+            )
+        else:
+            results = index.query(
+                vector=query_embedding,
+                top_k=TOP_K,
+                include_metadata=True
+            )
+        if not episodes:
+            matches = results.matches
+        s.set(episode_filter=episode_filter, episodes=episodes, chunks=len(matches))
 
     chunks = []
-    for match in results.matches:
+    missing = []
+    for match in matches:
+        # the local chunk store first, then the copy Pinecone vectors carry in metadata
+        text = chunk_store.get(match.id)
+        if text is None:
+            text = match.metadata.get("text")
+        if not text:
+            missing.append(match.id)
+            continue
         chunks.append({
             "episode": match.metadata["episode"],
+            "episodes": match.metadata.get("episodes", [match.metadata["episode"]]),
             "guest": match.metadata["guest"],
-            "text": match.metadata["text"],
+            "text": text,
             "score": match.score
         })
+    if missing:
+        # without text the model would be answering from empty excerpts
+        logger.warning("no text for %d retrieved chunks (%s); is data/chunk_texts.bin deployed?",
+                       len(missing), ", ".join(missing[:5]))
+        if not chunks:
+            raise RuntimeError(f"none of the {len(missing)} retrieved chunks has any text; "
+                               f"run pipeline/chunker.py (or deploy data/chunk_texts.*) on this host")
     return chunks
 
-def build_prompt(question, chunks):
+def use_summaries(question, episode_filter):
+    if HIERARCHICAL == "off" or episode_filter:
+        return False
+    if HIERARCHICAL != "always" and not BROAD_QUESTION.search(question):
+        return False
+    return summary_index.available()
+
+def search(question, query_embedding, episode_filter):
+    """Returns (summaries, chunks). Broad questions pick episodes by summary first, then chunks within them."""
+    if not use_summaries(question, episode_filter):
+        return [], query_index(query_embedding, episode_filter)
+    with span("summaries.query") as s:
+        summaries = summary_index.top_episodes(query_embedding, SUMMARY_EPISODES)
+        s.set(episodes=[e["episode"] for e in summaries])
+    return summaries, query_index(query_embedding, None, episodes=[e["episode"] for e in summaries])
+
+def retrieve_context(question, episode_filter):
+    with span("voyage.embed", model=EMBEDDING_MODEL) as s:
+        result = query_embedder.embed(question)
+        s.add_usage(result)
+        s.set(batch_size=result.batch_size)
+
+    return search(question, result.embeddings[0], episode_filter)
+
+async def aretrieve_context(question, episode_filter):
+    with span("voyage.embed", model=EMBEDDING_MODEL) as s:
+        result = await query_embedder.aembed(question)
+        s.add_usage(result)
+        s.set(batch_size=result.batch_size)
+
+    # the pinecone client is sync-only across the versions we support, so run it on a worker thread
+    return await asyncio.to_thread(search, question, result.embeddings[0], episode_filter)
+
+def retrieve_chunks(question, episode_filter):
+    return retrieve_context(question, episode_filter)[1]
+
+async def aretrieve_chunks(question, episode_filter):
+    return (await aretrieve_context(question, episode_filter))[1]
+
+def retrieve(question):
+    return retrieve_chunks(question, find_episode_filter(question))
+
+async def aretrieve(question):
+    return await aretrieve_chunks(question, find_episode_filter(question))
+
+def build_prompt(question, chunks, summaries=()):
     context = ""
     for chunk in chunks:
-        context += f"[Ep {chunk['episode']} – {chunk['guest']}]\n{chunk['text']}\n\n"
+        if len(chunk["episodes"]) > 1:
+            # intros, ad reads and the like; pinning them on one guest would mislead the answer
+            context += f"[Recurring segment, heard in {len(chunk['episodes'])} episodes]\n{chunk['text']}\n\n"
+        else:
+            context += f"[Ep {chunk['episode']} – {chunk['guest']}]\n{chunk['text']}\n\n"
+
+    if summaries:
+        overview = "".join(f"[Ep {e['episode']} – {e['guest']}]\n{e['summary']}\n\n" for e in summaries)
+        return f"""You are a helpful assistant with expertise on the Off Menu podcast, hosted by Ed Gamble and James Acaster. 
+Answer the question using only the episode summaries and transcript excerpts provided below. 
+If the answer isn't in them, say so honestly rather than guessing.
+Always mention which episode and guest the information comes from.
+
+EPISODE SUMMARIES:
+{overview}
+TRANSCRIPT EXCERPTS:
+{context}
+
+QUESTION: {question}"""
 
     return f"""You are a helpful assistant with expertise on the Off Menu podcast, hosted by Ed Gamble and James Acaster. 
 Answer the question using only the transcript excerpts provided below. 
@@ -88,17 +229,58 @@ TRANSCRIPT EXCERPTS:
 
 QUESTION: {question}"""
 
-def ask(question):
-    chunks = retrieve(question)
-    prompt = build_prompt(question, chunks)
+def answer_request(prompt, tier):
+    return {
+        "model": TIERS[tier]["model"],
+        "max_tokens": TIERS[tier]["max_tokens"],
+        "messages": [{"role": "user", "content": prompt}]
+    }
+
+def prepare(question, chunks, episode_filter, route, summaries=()):
+    prompt = build_prompt(question, chunks, summaries)
+    tier, reasons = choose_tier(question, chunks, episode_filter, route)
+    attrs = {
+        "model": TIERS[tier]["model"],
+        "tier": tier,
+        "tier_reasons": reasons,
+        "chunks": len(chunks),
+        "summaries": len(summaries),
+        "prompt_chars": len(prompt)
+    }
+    return prompt, tier, attrs
 
-    response = anthropic.messages.create(
-        model="claude-opus-4-6",
-        max_tokens=1024,
-        messages=[{"role": "user", "content": prompt}]
-    )
+def ask(question, route=None):
+    episode_filter = find_episode_filter(question)
+    summaries, chunks = retrieve_context(question, episode_filter)
+    prompt, tier, attrs = prepare(question, chunks, episode_filter, route, summaries)
+
+    with span("llm.answer", **attrs) as s:
+        response = anthropic.messages.create(**answer_request(prompt, tier))
+        s.add_usage(response)
     return response.content[0].text
 
+async def aask(question, route=None):
+    episode_filter = find_episode_filter(question)
+    summaries, chunks = await aretrieve_context(question, episode_filter)
+    prompt, tier, attrs = prepare(question, chunks, episode_filter, route, summaries)
+
+    with span("llm.answer", **attrs) as s:
+        response = await async_anthropic.messages.create(**answer_request(prompt, tier))
+        s.add_usage(response)
+    return response.content[0].text
+
+async def astream_ask(question, route=None):
+    """Like aask, but yields the answer text as it is generated."""
+    episode_filter = find_episode_filter(question)
+    summaries, chunks = await aretrieve_context(question, episode_filter)
+    prompt, tier, attrs = prepare(question, chunks, episode_filter, route, summaries)
+
+    with span("llm.answer", stream=True, **attrs) as s:
+        async with async_anthropic.messages.stream(**answer_request(prompt, tier)) as stream:
+            async for text in stream.text_stream:
+                yield text
+            s.add_usage(await stream.get_final_message())
+
 def main():
     print("Off Menu Chatbot (type 'quit' to exit)\n")
     while True:
@@ -1,6 +1,8 @@
 import os
 import anthropic
 from dotenv import load_dotenv
+from offmenu.tracing import span
+from offmenu import replay
 
 load_dotenv()
 
@@ -11,7 +13,12 @@ def get_secret(key: str) -> str:
     except Exception:
         return os.getenv(key)
     
-anthropic_client = anthropic.Anthropic(api_key=get_secret("ANTHROPIC_API_KEY"))
+anthropic_client = replay.wrap("anthropic", lambda: anthropic.Anthropic(api_key=get_secret("ANTHROPIC_API_KEY")))
+async_anthropic_client = replay.wrap(
+    "anthropic", lambda: anthropic.AsyncAnthropic(api_key=get_secret("ANTHROPIC_API_KEY")), is_async=True
+)
+
+ROUTER_MODEL = "claude-haiku-4-5-20251001"
 
 ROUTER_PROMPT = """You are a routing assistant for a chatbot about the Off Menu podcast.
 The podcast has two types of data available:
@@ -42,16 +49,34 @@ Examples:
 
 Return only the label, nothing else."""
 
-def get_route(question: str) -> str:
-    response = anthropic_client.messages.create(
-        model="claude-haiku-4-5-20251001",
-        max_tokens=10,
-        messages=[{
+def route_request(question: str) -> dict:
+    return {
+        "model": ROUTER_MODEL,
+        "max_tokens": 10,
+        "messages": [{
             "role": "user",
             "content": f"{ROUTER_PROMPT}\n\nQuestion: {question}"
         }]
-    )
+    }
+
+def parse_route(response) -> str:
     label = response.content[0].text.strip().lower().strip('"')
     if label not in ("csv", "rag", "meta", "unclear"):
         return "unclear"
+    return label
+
+def get_route(question: str) -> str:
+    with span("get_route") as s:
+        response = anthropic_client.messages.create(**route_request(question))
+        s.add_usage(response)
+        label = parse_route(response)
+        s.set(route=label)
+    return label
+
+async def aget_route(question: str) -> str:
+    with span("get_route") as s:
+        response = await async_anthropic_client.messages.create(**route_request(question))
+        s.add_usage(response)
+        label = parse_route(response)
+        s.set(route=label)
     return label
\ No newline at end of file
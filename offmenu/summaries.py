@@ -0,0 +1,56 @@
+import json
+import os
+import threading
+
+from offmenu.vector_index import LocalVectorIndex
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# both written by pipeline/summariser.py
+SUMMARIES_FILE = os.path.join(BASE_DIR, "data", "episode_summaries.json")
+SUMMARY_INDEX_DIR = os.path.join(BASE_DIR, "data", "summary_index")
+
+
+class SummaryIndex:
+    """One embedded summary per episode, for picking which episodes a broad question should look in. Opened on first use."""
+
+    def __init__(self, summaries_file: str = SUMMARIES_FILE, index_dir: str = SUMMARY_INDEX_DIR):
+        self.summaries_file = summaries_file
+        self.index_dir = index_dir
+        self._summaries = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> bool:
+        with self._lock:
+            if self._summaries is None:
+                meta_path = os.path.join(self.index_dir, "meta.json")
+                if not (os.path.exists(self.summaries_file) and os.path.exists(meta_path)):
+                    self._summaries = {}
+                    return False
+                with open(self.summaries_file, "r", encoding="utf-8") as f:
+                    summaries = json.load(f)
+                self._index = LocalVectorIndex.load(self.index_dir)
+                self._summaries = summaries
+        return bool(self._summaries)
+
+    def available(self) -> bool:
+        return self._open()
+
+    def top_episodes(self, query_embedding, k: int) -> list[dict]:
+        if not self._open():
+            return []
+        results = self._index.query(query_embedding, top_k=k)
+        episodes = []
+        for match in results.matches:
+            entry = self._summaries.get(match.metadata["episode"])
+            if entry is not None:
+                episodes.append({
+                    "episode": match.metadata["episode"],
+                    "guest": entry["guest"],
+                    "summary": entry["summary"],
+                    "score": match.score
+                })
+        return episodes
+
+
+summary_index = SummaryIndex()
@@ -0,0 +1,58 @@
+import os
+import re
+
+TIERS = {
+    "small": {"model": "claude-haiku-4-5-20251001", "max_tokens": 512},
+    "large": {"model": "claude-opus-4-6", "max_tokens": 1024},
+}
+
+def get_secret(key: str) -> str:
+    try:
+        import streamlit as st
+        return st.secrets[key]
+    except Exception:
+        return os.getenv(key)
+
+# "auto" (default), or "small"/"large" to force a tier
+FORCED_TIER = (get_secret("OFFMENU_MODEL_TIER") or "auto").lower()
+
+# questions that need reasoning across episodes or about why/how, rather than looking up a fact
+SYNTHESIS_PATTERN = re.compile(
+    r"\b(any|anyone|every|ever|all|most|least|compare|comparison|difference|pattern|trend|vibe|"
+    r"why|how come|overall|in general|across|which guests|who else|summar\w*)\b",
+    re.IGNORECASE,
+)
+CLEAR_WINNER_SPREAD = 0.08   # top score this far above the rest means one passage has the answer
+LARGE_THRESHOLD = 2          # points needed to send a question to the large model
+
+
+def choose_tier(question: str, chunks: list[dict], episode_filter: str | None, route: str | None = None) -> tuple[str, list[str]]:
+    """Pick "small" or "large" for a RAG answer from cheap question and retrieval features.
+
+    Returns the tier and the reasons behind it, for logging.
+    """
+    if FORCED_TIER in TIERS:
+        return FORCED_TIER, [f"forced by OFFMENU_MODEL_TIER={FORCED_TIER}"]
+
+    points, reasons = 0, []
+    if route == "unclear":
+        points += 1
+        reasons.append("router unsure")
+    if SYNTHESIS_PATTERN.search(question):
+        points += 2
+        reasons.append("synthesis wording")
+    if episode_filter:
+        points -= 1
+        reasons.append(f"single episode {episode_filter}")
+
+    scores = sorted((c["score"] for c in chunks), reverse=True)
+    if len(scores) > 1:
+        spread = scores[0] - sum(scores[1:]) / (len(scores) - 1)
+        if spread >= CLEAR_WINNER_SPREAD:
+            points -= 1
+            reasons.append(f"clear top hit (spread {spread:.2f})")
+    if len({c["episode"] for c in chunks}) > 3:
+        points += 1
+        reasons.append("hits spread across episodes")
+
+    return ("large" if points >= LARGE_THRESHOLD else "small"), reasons
@@ -0,0 +1,128 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+# "stderr" (default), "off", or a file path to append JSON lines to
+TRACE_LOG = os.getenv("OFFMENU_TRACE_LOG", "stderr")
+
+logger = logging.getLogger("offmenu.trace")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+if TRACE_LOG.lower() == "off":
+    logger.addHandler(logging.NullHandler())
+elif TRACE_LOG.lower() == "stderr":
+    logger.addHandler(logging.StreamHandler(sys.stderr))
+else:
+    logger.addHandler(logging.FileHandler(TRACE_LOG, encoding="utf-8"))
+
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+
+_current_trace = contextvars.ContextVar("offmenu_trace", default=None)
+_current_span = contextvars.ContextVar("offmenu_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, parent: str | None, offset_ms: float, attrs: dict):
+        self.name = name
+        self.parent = parent
+        self.offset_ms = offset_ms
+        self.duration_ms = None
+        self.attrs = attrs
+        self.tokens = {}
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add_usage(self, response):
+        """Record token usage from an Anthropic message or a Voyage embeddings result."""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            for field in TOKEN_FIELDS:
+                value = getattr(usage, field, None)
+                if value:
+                    self.tokens[field] = self.tokens.get(field, 0) + value
+        total = getattr(response, "total_tokens", None)
+        if total:
+            self.tokens["embedding_tokens"] = self.tokens.get("embedding_tokens", 0) + total
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "parent": self.parent,
+            "offset_ms": round(self.offset_ms, 2),
+            "duration_ms": round(self.duration_ms, 2) if self.duration_ms is not None else None,
+            **({"tokens": self.tokens} if self.tokens else {}),
+            **({"attrs": self.attrs} if self.attrs else {}),
+        }
+
+
+class Trace:
+    def __init__(self, name: str, attrs: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.attrs = attrs
+        self.spans = []
+        self.start = time.perf_counter()
+        self.duration_ms = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def tokens(self) -> dict:
+        totals = {}
+        for span in self.spans:
+            for field, value in span.tokens.items():
+                totals[field] = totals.get(field, 0) + value
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "duration_ms": round(self.duration_ms, 2) if self.duration_ms is not None else None,
+            "tokens": self.tokens(),
+            "attrs": self.attrs,
+            "spans": [span.to_dict() for span in sorted(self.spans, key=lambda s: s.offset_ms)],
+        }
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """Collect every span opened inside this block into one record, logged as JSON on exit."""
+    current = Trace(name, attrs)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set(error=repr(e))
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - current.start) * 1000
+        _current_trace.reset(token)
+        logger.info(json.dumps(current.to_dict(), ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a stage of the current trace. Outside a trace the span is still usable but not recorded."""
+    current = _current_trace.get()
+    parent = _current_span.get()
+    start = time.perf_counter()
+    offset_ms = (start - current.start) * 1000 if current else 0.0
+    record = Span(name, parent.name if parent else None, offset_ms, attrs)
+    token = _current_span.set(record)
+    try:
+        yield record
+    except Exception as e:
+        record.set(error=repr(e))
+        raise
+    finally:
+        record.duration_ms = (time.perf_counter() - start) * 1000
+        _current_span.reset(token)
+        if current is not None:
+            current.spans.append(record)
@@ -0,0 +1,152 @@
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_DIR = os.path.join(BASE_DIR, "data", "index")
+
+QUANTISATION = "int8"       # "int8" (4x smaller than float32) or "binary" (32x smaller)
+RERANK_CANDIDATES = 300     # candidates from the compact scan that get re-scored at full precision
+SCAN_BLOCK_ROWS = 8192      # rows of codes upcast at a time during the int8 scan
+
+# bits set in each byte value, for Hamming distance on packed binary codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def quantise(vectors: np.ndarray, scheme: str) -> tuple[np.ndarray, float]:
+    """Compact codes for unit-length vectors. Returns (codes, scale) where int8 codes ≈ vectors * scale."""
+    if scheme == "binary":
+        return np.packbits(vectors > 0, axis=1), 1.0
+    scale = 127.0 / max(float(np.abs(vectors).max(initial=0.0)), 1e-12)
+    return np.clip(np.round(vectors * scale), -127, 127).astype(np.int8), scale
+
+
+class LocalVectorIndex:
+    """Quantised in-memory codes for candidate generation, with full-precision vectors memory-mapped from disk for re-ranking.
+
+    query() mirrors the subset of Pinecone's Index.query that the retriever uses.
+    """
+
+    def __init__(self, ids, metadata, vectors, codes, scheme, scale):
+        self.ids = ids
+        self.metadata = metadata
+        self.vectors = vectors
+        self.codes = codes
+        self.scheme = scheme
+        self.scale = scale
+        self.episodes = np.array([m["episode"] for m in metadata])
+        # deduplicated chunks list every episode they were found in
+        rows_by_episode = {}
+        for row, m in enumerate(metadata):
+            for episode in m.get("episodes", [m["episode"]]):
+                rows_by_episode.setdefault(episode, []).append(row)
+        self.rows_by_episode = {ep: np.array(rows) for ep, rows in rows_by_episode.items()}
+
+    # --- building ---
+
+    @staticmethod
+    def save(ids: list[str], vectors, metadata: list[dict], index_dir: str = INDEX_DIR, scheme: str = QUANTISATION):
+        os.makedirs(index_dir, exist_ok=True)
+        vectors = np.array(vectors, dtype=np.float32)
+        if len(ids) == 0:
+            # nothing to index yet; still write a valid, empty index
+            vectors = vectors.reshape(0, vectors.shape[1] if vectors.ndim == 2 else 0)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        codes, scale = quantise(vectors, scheme)
+
+        vectors.tofile(os.path.join(index_dir, "vectors.f32"))
+        np.save(os.path.join(index_dir, "codes.npy"), codes)
+        with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "dim": vectors.shape[1],
+                "count": vectors.shape[0],
+                "quantisation": scheme,
+                "scale": scale,
+                "ids": ids,
+                "metadata": metadata
+            }, f, ensure_ascii=False)
+
+    @staticmethod
+    def read_all(index_dir: str = INDEX_DIR) -> tuple[list[str], np.ndarray, list[dict]]:
+        """Full-precision contents of an existing index, for incremental rebuilds."""
+        meta_path = os.path.join(index_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return [], np.zeros((0, 0), dtype=np.float32), []
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.fromfile(os.path.join(index_dir, "vectors.f32"), dtype=np.float32)
+        return meta["ids"], vectors.reshape(meta["count"], meta["dim"]), meta["metadata"]
+
+    # --- serving ---
+
+    @classmethod
+    def load(cls, index_dir: str = INDEX_DIR) -> "LocalVectorIndex":
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        # only the compact codes live in RAM; full vectors are paged in for the candidates we re-rank
+        if meta["count"]:
+            vectors = np.memmap(os.path.join(index_dir, "vectors.f32"), dtype=np.float32, mode="r",
+                                shape=(meta["count"], meta["dim"]))
+        else:
+            # an empty file can't be memory-mapped
+            vectors = np.zeros((0, meta["dim"]), dtype=np.float32)
+        codes = np.load(os.path.join(index_dir, "codes.npy"))
+        return cls(meta["ids"], meta["metadata"], vectors, codes, meta["quantisation"], meta["scale"])
+
+    def _filter_rows(self, filter: dict) -> np.ndarray:
+        """Rows matching the Pinecone-style filters the retriever sends: $eq/$in on episode or episodes, and $or."""
+        if "$or" in filter:
+            return np.unique(np.concatenate([self._filter_rows(f) for f in filter["$or"]]))
+        rows = np.arange(len(self.ids))
+        for field, condition in filter.items():
+            values = [condition["$eq"]] if "$eq" in condition else condition["$in"]
+            if field == "episode":
+                selected = np.flatnonzero(np.isin(self.episodes, values))
+            elif field == "episodes":
+                selected = np.concatenate([self.rows_by_episode.get(v, np.empty(0, dtype=int)) for v in values])
+            else:
+                raise ValueError(f"unsupported filter field: {field}")
+            rows = np.intersect1d(rows, selected)
+        return rows
+
+    def _scan(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Approximate similarity of the query to the given rows, computed from the codes alone."""
+        if self.scheme == "binary":
+            q_bits = np.packbits(query > 0)
+            distances = _POPCOUNT[np.bitwise_xor(self.codes[rows], q_bits)].sum(axis=1, dtype=np.int32)
+            return -distances.astype(np.float32)
+        q = query.astype(np.float32)
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), SCAN_BLOCK_ROWS):
+            block = rows[start:start + SCAN_BLOCK_ROWS]
+            scores[start:start + len(block)] = self.codes[block].astype(np.float32) @ q
+        return scores
+
+    def query(self, vector, top_k: int, include_metadata: bool = True, filter: dict | None = None):
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+
+        rows = self._filter_rows(filter) if filter else np.arange(len(self.ids))
+        if len(rows) == 0:
+            return SimpleNamespace(matches=[])
+
+        approx = self._scan(query, rows)
+        n_candidates = min(max(RERANK_CANDIDATES, top_k), len(rows))
+        candidates = rows[np.argpartition(-approx, n_candidates - 1)[:n_candidates]]
+
+        # exact cosine on the survivors; sorting keeps the memmap reads sequential
+        candidates.sort()
+        exact = self.vectors[candidates] @ query
+        order = np.argsort(-exact)[:top_k]
+
+        matches = [
+            SimpleNamespace(
+                id=self.ids[candidates[i]],
+                score=float(exact[i]),
+                metadata=self.metadata[candidates[i]] if include_metadata else {}
+            )
+            for i in order
+        ]
+        return SimpleNamespace(matches=matches)
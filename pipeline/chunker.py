@@ -1,11 +1,24 @@
 import os
+import re
 import json
+import telemetry
 
 INPUT_DIR = "data/cleaned"
 OUTPUT_FILE = "data/chunks.json"
+# chunk texts concatenated as UTF-8, plus {chunk_id: [byte_offset, byte_length]}; memory-mapped by offmenu.chunk_store
+STORE_FILE = "data/chunk_texts.bin"
+STORE_INDEX_FILE = "data/chunk_texts.idx.json"
 
 CHUNK_SIZE = 500
 OVERLAP = 100
+# "characters", "sentences", "speaker_turns" or "tokens"; see benchmarks/chunking.py for how they compare
+STRATEGY = "characters"
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+# transcript lines start with the speaker, e.g. "Ed:" or "Marian Keyes:"
+SPEAKER_LINE = re.compile(r"^[A-Z][\w.'’ -]{0,40}:", re.MULTILINE)
+# rough stand-in for the embedding model's tokenizer: words and individual punctuation marks
+TOKEN = re.compile(r"\w+|[^\w\s]")
 
 def parse_metadata(text):
     lines = text.split("\n")
@@ -26,7 +39,13 @@ def remove_metadata_header(text):
             return "\n".join(lines[i:]).strip()
     return text
 
+def check_window(chunk_size, overlap):
+    # each chunk has to move the window forward, or the chunkers never finish
+    if chunk_size <= 0 or not 0 <= overlap < chunk_size:
+        raise ValueError(f"need 0 <= overlap < chunk_size, got chunk_size={chunk_size}, overlap={overlap}")
+
 def chunk_text(text, chunk_size, overlap):
+    check_window(chunk_size, overlap)
     chunks = []
     start = 0
     while start < len(text):
@@ -35,36 +54,123 @@ def chunk_text(text, chunk_size, overlap):
         start += chunk_size - overlap
     return chunks
 
+def pack_pieces(pieces, chunk_size, overlap, sep=" "):
+    # greedily join whole pieces up to chunk_size characters, carrying trailing pieces
+    # worth up to `overlap` characters into the next chunk
+    check_window(chunk_size, overlap)
+    chunks, current = [], []
+    for piece in pieces:
+        if current and len(sep.join(current + [piece])) > chunk_size:
+            chunks.append(sep.join(current))
+            carried = []
+            for prev in reversed(current):
+                if len(sep.join([prev] + carried)) > overlap:
+                    break
+                carried.insert(0, prev)
+            current = carried
+        current.append(piece)
+    if current:
+        chunks.append(sep.join(current))
+    return chunks
+
+def split_sentences(text):
+    return [s.strip() for s in SENTENCE_END.split(text) if s.strip()]
+
+def chunk_sentences(text, chunk_size, overlap):
+    pieces = []
+    for sentence in split_sentences(text):
+        # a run-on "sentence" longer than a chunk is cut by characters
+        pieces.extend(chunk_text(sentence, chunk_size, 0) if len(sentence) > chunk_size else [sentence])
+    return pack_pieces(pieces, chunk_size, overlap)
+
+def split_speaker_turns(text):
+    starts = [m.start() for m in SPEAKER_LINE.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    turns = [text[a:b].strip() for a, b in zip(starts, starts[1:] + [len(text)])]
+    return [t for t in turns if t]
+
+def chunk_speaker_turns(text, chunk_size, overlap):
+    pieces = []
+    for turn in split_speaker_turns(text):
+        # long monologues fall back to sentence boundaries
+        pieces.extend(chunk_sentences(turn, chunk_size, 0) if len(turn) > chunk_size else [turn])
+    return pack_pieces(pieces, chunk_size, overlap, sep="\n")
+
+def chunk_tokens(text, chunk_size, overlap):
+    # chunk_size and overlap count approximate tokens here, not characters
+    check_window(chunk_size, overlap)
+    spans = [m.span() for m in TOKEN.finditer(text)]
+    chunks = []
+    start = 0
+    while start < len(spans):
+        end = min(start + chunk_size, len(spans))
+        chunks.append(text[spans[start][0]:spans[end - 1][1]])
+        if end == len(spans):
+            break
+        start = end - overlap
+    return chunks
+
+STRATEGIES = {
+    "characters": chunk_text,
+    "sentences": chunk_sentences,
+    "speaker_turns": chunk_speaker_turns,
+    "tokens": chunk_tokens,
+}
+
+def chunk_id(chunk):
+    # matches the vector IDs written by embedder.py
+    return f"ep{chunk['episode']}_chunk{chunk['chunk_index']}"
+
+def write_text_store(chunks):
+    offsets = {}
+    position = 0
+    with open(STORE_FILE, "wb") as f:
+        for chunk in chunks:
+            data = chunk["text"].encode("utf-8")
+            f.write(data)
+            offsets[chunk_id(chunk)] = [position, len(data)]
+            position += len(data)
+    with open(STORE_INDEX_FILE, "w", encoding="utf-8") as f:
+        json.dump(offsets, f)
+    return position
+
 def main():
     os.makedirs("data", exist_ok=True)
     files = [f for f in os.listdir(INPUT_DIR) if f.endswith(".txt")]
     print(f"Found {len(files)} cleaned transcripts\n")
 
     all_chunks = []
-    for filename in files:
-        path = os.path.join(INPUT_DIR, filename)
-        with open(path, "r", encoding="utf-8") as f:
-            text = f.read()
+    with telemetry.run("chunker", strategy=STRATEGY, chunk_size=CHUNK_SIZE, overlap=OVERLAP):
+        for filename in files:
+            with telemetry.item(filename) as item:
+                path = os.path.join(INPUT_DIR, filename)
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+
+                episode, guest = parse_metadata(text)
+                body = remove_metadata_header(text)
+                chunks = STRATEGIES[STRATEGY](body, CHUNK_SIZE, OVERLAP)
 
-        episode, guest = parse_metadata(text)
-        body = remove_metadata_header(text)
-        chunks = chunk_text(body, CHUNK_SIZE, OVERLAP)
+                for i, chunk in enumerate(chunks):
+                    all_chunks.append({
+                        "episode": episode,
+                        "guest": guest,
+                        "chunk_index": i,
+                        "text": chunk
+                    })
+                item.set(chunks=len(chunks))
 
-        for i, chunk in enumerate(chunks):
-            all_chunks.append({
-                "episode": episode,
-                "guest": guest,
-                "chunk_index": i,
-                "text": chunk
-            })
+            print(f"Ep {episode} – {guest}: {len(chunks)} chunks")
 
-        print(f"Ep {episode} – {guest}: {len(chunks)} chunks")
+        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+            json.dump(all_chunks, f, indent=2, ensure_ascii=False)
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(all_chunks, f, indent=2, ensure_ascii=False)
+        store_bytes = write_text_store(all_chunks)
 
     print(f"\nTotal chunks: {len(all_chunks)}")
     print(f"Saved to {OUTPUT_FILE}")
+    print(f"Saved text store to {STORE_FILE} ({store_bytes:,} bytes)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import os
 import re
+import telemetry
 
 INPUT_DIR = "data/transcripts"
 OUTPUT_DIR = "data/cleaned"
@@ -48,24 +49,27 @@ def main():
     files = [f for f in os.listdir(INPUT_DIR) if f.endswith(".txt")]
     print(f"Found {len(files)} transcripts to clean\n")
 
-    for filename in files:
-        meta = parse_filename(filename)
-        input_path = os.path.join(INPUT_DIR, filename)
-        output_path = os.path.join(OUTPUT_DIR, filename)
+    with telemetry.run("cleaner"):
+        for filename in files:
+            meta = parse_filename(filename)
+            input_path = os.path.join(INPUT_DIR, filename)
+            output_path = os.path.join(OUTPUT_DIR, filename)
 
-        with open(input_path, "r", encoding="utf-8") as f:
-            raw = f.read()
+            with telemetry.item(f"Ep {meta['episode']}") as item:
+                with open(input_path, "r", encoding="utf-8") as f:
+                    raw = f.read()
 
-        cleaned = clean_text(raw)
+                cleaned = clean_text(raw)
 
-        # prepend metadata header so we always know what episode this is
-        header = f"EPISODE: {meta['episode']}\nGUEST: {meta['guest']}\n\n"
-        final = header + cleaned
+                # prepend metadata header so we always know what episode this is
+                header = f"EPISODE: {meta['episode']}\nGUEST: {meta['guest']}\n\n"
+                final = header + cleaned
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(final)
+                with open(output_path, "w", encoding="utf-8") as f:
+                    f.write(final)
+                item.set(chars_in=len(raw), chars_out=len(final))
 
-        print(f"Cleaned: Ep {meta['episode']} – {meta['guest']}")
+            print(f"Cleaned: Ep {meta['episode']} – {meta['guest']}")
 
     print("\nDone!")
 
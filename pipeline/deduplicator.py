@@ -0,0 +1,103 @@
+import re
+import json
+import hashlib
+import numpy as np
+import telemetry
+
+from chunker import write_text_store, chunk_id
+
+INPUT_FILE = "data/chunks.json"
+OUTPUT_FILE = "data/chunks_deduped.json"
+
+SHINGLE_WORDS = 5           # word n-grams compared between chunks
+NUM_PERM = 128              # minhash signature length
+BANDS = 16                  # LSH bands of NUM_PERM // BANDS rows; candidates start at roughly 0.7 similarity
+SIMILARITY_THRESHOLD = 0.8  # estimated Jaccard needed to fold a chunk into an existing one
+SEED = 1
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+_rng = np.random.RandomState(SEED)
+_perm_a = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+_perm_b = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+
+def shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+def minhash(text):
+    # None for chunks too short to shingle; they're always kept
+    grams = shingles(text)
+    if not grams:
+        return None
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little") for g in grams],
+        dtype=np.uint64
+    )
+    # uint64 arithmetic wraps, which is fine for hashing
+    permuted = ((hashes[:, None] * _perm_a + _perm_b) % MERSENNE_PRIME) & MAX_HASH
+    return permuted.min(axis=0)
+
+def band_keys(signature):
+    rows = NUM_PERM // BANDS
+    return [(b, signature[b * rows:(b + 1) * rows].tobytes()) for b in range(BANDS)]
+
+def deduplicate(chunks):
+    # each chunk is compared against the canonical chunks kept so far (not against other duplicates),
+    # so a chain of slightly-different chunks can't drift into one cluster
+    canonical, signatures = [], []
+    buckets = {}
+    for chunk in chunks:
+        signature = minhash(chunk["text"])
+        match = None
+        if signature is not None:
+            candidates = {i for key in band_keys(signature) for i in buckets.get(key, [])}
+            best = 0.0
+            for i in candidates:
+                similarity = float(np.mean(signatures[i] == signature))
+                if similarity >= SIMILARITY_THRESHOLD and similarity > best:
+                    match, best = i, similarity
+
+        if match is not None:
+            kept = canonical[match]
+            if chunk["episode"] not in kept["episodes"]:
+                kept["episodes"].append(chunk["episode"])
+            kept["duplicates"].append(chunk_id(chunk))
+            continue
+
+        canonical.append({**chunk, "episodes": [chunk["episode"]], "duplicates": []})
+        signatures.append(signature)
+        if signature is not None:
+            for key in band_keys(signature):
+                buckets.setdefault(key, []).append(len(canonical) - 1)
+    return canonical
+
+def main():
+    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    print(f"Loaded {len(chunks)} chunks\n")
+
+    with telemetry.run("deduplicator", threshold=SIMILARITY_THRESHOLD, bands=BANDS):
+        with telemetry.item("deduplicate", chunks_in=len(chunks)) as item:
+            deduped = deduplicate(chunks)
+            item.set(chunks_out=len(deduped))
+
+    repeated = sorted((c for c in deduped if c["duplicates"]), key=lambda c: -len(c["duplicates"]))
+    for c in repeated[:10]:
+        preview = " ".join(c["text"].split())[:80]
+        print(f"{len(c['duplicates']) + 1:>4}× in {len(c['episodes'])} episodes: {preview}…")
+
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+        json.dump(deduped, f, indent=2, ensure_ascii=False)
+
+    # only canonical chunks are ever indexed, so only their texts need to be in the store
+    store_bytes = write_text_store(deduped)
+
+    removed = len(chunks) - len(deduped)
+    print(f"\nKept {len(deduped)} of {len(chunks)} chunks ({removed} near-duplicates, {removed / max(len(chunks), 1):.1%})")
+    print(f"Saved to {OUTPUT_FILE}")
+    print(f"Saved text store ({store_bytes:,} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import voyageai
 from pinecone import Pinecone, ServerlessSpec
@@ -6,7 +7,14 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from offmenu.vector_index import LocalVectorIndex
+from offmenu import replay
+import telemetry
+
 CHUNKS_FILE = "data/chunks.json"
+# written by deduplicator.py; preferred when present so boilerplate is only embedded once
+DEDUPED_CHUNKS_FILE = "data/chunks_deduped.json"
 PINECONE_INDEX = "offmenu"
 EMBEDDING_MODEL = "voyage-3-lite"
 BATCH_SIZE = 128
@@ -14,21 +22,23 @@ TARGET_EPISODES = ("167", "168", "169")
 
 def main():
     # load chunks
-    with open(CHUNKS_FILE, "r", encoding="utf-8") as f:
+    chunks_file = DEDUPED_CHUNKS_FILE if os.path.exists(DEDUPED_CHUNKS_FILE) else CHUNKS_FILE
+    with open(chunks_file, "r", encoding="utf-8") as f:
         chunks = json.load(f)
-    print(f"Loaded {len(chunks)} chunks total\n")
+    print(f"Loaded {len(chunks)} chunks total from {chunks_file}\n")
 
-    # filter to target episodes only
-    chunks = [c for c in chunks if c["episode"] in TARGET_EPISODES]
+    # filter to target episodes only; a deduplicated chunk counts for every episode it appears in
+    chunks = [c for c in chunks if any(ep in TARGET_EPISODES for ep in c.get("episodes", [c["episode"]]))]
     print(f"Filtered to {len(chunks)} chunks for episodes {TARGET_EPISODES}\n")
 
     # set up voyage client
-    voyage = voyageai.Client(api_key=os.getenv("VOYAGE_API_KEY"))
+    voyage = replay.wrap("voyage", lambda: voyageai.Client(api_key=os.getenv("VOYAGE_API_KEY")))
 
     # set up pinecone
-    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    pc = replay.wrap("pinecone", lambda: Pinecone(api_key=os.getenv("PINECONE_API_KEY")))
 
-    if PINECONE_INDEX not in pc.list_indexes().names():
+    # has_index rather than list_indexes(): a plain bool, so it records and replays like any other call
+    if not pc.has_index(PINECONE_INDEX):
         print("Creating Pinecone index...")
         pc.create_index(
             name=PINECONE_INDEX,
@@ -48,28 +58,53 @@ def main():
 
     # embed and upsert in batches
     total = len(chunks)
-    for batch_start in range(0, total, BATCH_SIZE):
-        batch = chunks[batch_start: batch_start + BATCH_SIZE]
-        texts = [c["text"] for c in batch]
-
-        result = voyage.embed(texts, model=EMBEDDING_MODEL, input_type="document")
-        embeddings = result.embeddings
-
-        vectors = []
-        for i, (chunk, embedding) in enumerate(zip(batch, embeddings)):
-            vector_id = f"ep{chunk['episode']}_chunk{chunk['chunk_index']}"
-            vectors.append({
-                "id": vector_id,
-                "values": embedding,
-                "metadata": {
-                    "episode": chunk["episode"],
-                    "guest": chunk["guest"],
-                    "text": chunk["text"]
-                }
-            })
-
-        index.upsert(vectors=vectors)
-        print(f"Upserted chunks {batch_start + 1}–{min(batch_start + BATCH_SIZE, total)} of {total}")
+    local_ids, local_vectors, local_metadata = [], [], []
+    with telemetry.run("embedder", episodes=list(TARGET_EPISODES), batch_size=BATCH_SIZE):
+        for batch_start in range(0, total, BATCH_SIZE):
+            batch = chunks[batch_start: batch_start + BATCH_SIZE]
+            texts = [c["text"] for c in batch]
+
+            with telemetry.item(f"chunks {batch_start + 1}–{min(batch_start + BATCH_SIZE, total)}", chunks=len(batch)):
+                result = voyage.embed(texts, model=EMBEDDING_MODEL, input_type="document")
+                telemetry.add_usage(result)
+                embeddings = result.embeddings
+
+                vectors = []
+                for i, (chunk, embedding) in enumerate(zip(batch, embeddings)):
+                    vector_id = f"ep{chunk['episode']}_chunk{chunk['chunk_index']}"
+                    vectors.append({
+                        "id": vector_id,
+                        "values": embedding,
+                        # the retriever reads texts from the local chunk store (see chunker.py) when it's there;
+                        # the copy in metadata covers hosts serving from Pinecone without the store
+                        "metadata": {
+                            "episode": chunk["episode"],
+                            "episodes": chunk.get("episodes", [chunk["episode"]]),
+                            "guest": chunk["guest"],
+                            "chunk_id": vector_id,
+                            "text": chunk["text"]
+                        }
+                    })
+
+                index.upsert(vectors=vectors)
+            print(f"Upserted chunks {batch_start + 1}–{min(batch_start + BATCH_SIZE, total)} of {total}")
+
+            for v in vectors:
+                local_ids.append(v["id"])
+                local_vectors.append(v["values"])
+                # the local index is always built next to the store, so it doesn't need the texts
+                local_metadata.append({k: val for k, val in v["metadata"].items() if k != "text"})
+
+    # mirror into the local quantised index, replacing whatever it held for the target episodes
+    old_ids, old_vectors, old_metadata = LocalVectorIndex.read_all()
+    new_ids = set(local_ids)
+    keep = [i for i, m in enumerate(old_metadata) if m["episode"] not in TARGET_EPISODES and old_ids[i] not in new_ids]
+    LocalVectorIndex.save(
+        [old_ids[i] for i in keep] + local_ids,
+        [old_vectors[i] for i in keep] + local_vectors,
+        [old_metadata[i] for i in keep] + local_metadata
+    )
+    print(f"Saved local index with {len(keep) + len(local_ids)} vectors")
 
     print("\nDone! All chunks embedded and stored in Pinecone.")
 
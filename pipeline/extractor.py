@@ -1,28 +1,39 @@
 import os
+import sys
 import json
 import csv
 import time
+import argparse
 from anthropic import Anthropic
 from dotenv import load_dotenv
+from segmenter import menu_excerpt
+from fields import FIELDS
+import telemetry
 
 load_dotenv()
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from offmenu import replay
+
 INPUT_DIR = "data/cleaned"
 OUTPUT_FILE = "data/menu_choices.csv"
+NORMALISED_FILE = "data/menu_choices_normalised.csv"
+# every (episode, field) extracted but not yet merged into the CSVs, so an interrupted run loses nothing
+LOG_FILE = "data/extraction_log.jsonl"
 
-anthropic = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-
-COLUMNS = [
-    "episode", "guest", "starter", "main", "dessert",
-    "drink", "still_or_sparkling", "poppadoms_or_bread", "christmas_dinner"
-]
+anthropic = replay.wrap(
+    "anthropic",
+    lambda: Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), http_client=telemetry.anthropic_http_client())
+)
 
 PROMPT_TEMPLATE = """You are extracting structured data from an Off Menu podcast transcript.
-Off Menu is a podcast where Ed Gamble and James Acaster ask guests to describe their perfect dream meal in a magical restaurant. 
-The guests choose: a drink, still or sparkling water, poppadoms or bread, a starter, a main course, a dessert, and optionally a christmas dinner (christmas special episodes only).
+Off Menu is a podcast where Ed Gamble and James Acaster ask guests to describe their perfect dream meal in a magical restaurant.
+The guests choose: a drink, still or sparkling water, poppadoms or bread, a starter, a main course with a side dish, a dessert, and optionally a christmas dinner (christmas special episodes only).
+
+Extract the guest's final choice for each of these fields from the transcript below. It may be cut down to the excerpts where the menu is discussed, separated by [...].
+{field_list}
 
-Extract the guest's final choices for each category from the transcript below.
-Return ONLY a JSON object with these exact keys: starter, main, dessert, drink, still_or_sparkling, poppadoms_or_bread, christmas_dinner.
+Return ONLY a JSON object with these exact keys: {keys}.
 If a category was not chosen or not mentioned, use null.
 If the guest was indecisive or chose multiple things, list them all as a single string.
 Do not include any explanation or text outside the JSON object.
@@ -30,22 +41,25 @@ Do not include any explanation or text outside the JSON object.
 TRANSCRIPT:
 {transcript}"""
 
-def extract_choices(transcript, episode, guest):
-    prompt = PROMPT_TEMPLATE.format(transcript=transcript)
-    
+def extract_choices(transcript, fields):
+    prompt = PROMPT_TEMPLATE.format(
+        field_list="\n".join(f"- {name}: {FIELDS[name]}" for name in fields),
+        keys=", ".join(fields),
+        transcript=transcript
+    )
+
     response = anthropic.messages.create(
         model="claude-haiku-4-5-20251001",
-        max_tokens=512,
+        max_tokens=64 + 64 * len(fields),
         messages=[{"role": "user", "content": prompt}]
     )
-    
+    telemetry.add_usage(response.usage)
+
     raw = response.content[0].text.strip()
     # strip markdown code fences if claude returns them
     raw = raw.replace("```json", "").replace("```", "").strip()
     choices = json.loads(raw)
-    choices["episode"] = episode
-    choices["guest"] = guest
-    return choices
+    return {name: None if choices.get(name) is None else str(choices[name]) for name in fields}
 
 def parse_metadata(text):
     episode, guest = "unknown", "unknown"
@@ -56,56 +70,149 @@ def parse_metadata(text):
             guest = line.replace("GUEST:", "").strip()
     return episode, guest
 
-def load_processed_episodes():
-    processed = set()
-    if os.path.exists(OUTPUT_FILE):
-        with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                processed.add(row["episode"])
-    return processed
+def read_csv(path):
+    if not os.path.exists(path):
+        return [], []
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return list(reader.fieldnames or []), list(reader)
+
+def write_csv(path, columns, rows):
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+def load_log():
+    entries = []
+    if os.path.exists(LOG_FILE):
+        with open(LOG_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+    return entries
+
+def load_completed():
+    """(episode, field) pairs already extracted: every cell of the CSV's columns (empty ones are fields
+    the guest never chose), plus what the extraction log holds that isn't in the CSV yet."""
+    completed = set()
+    columns, rows = read_csv(OUTPUT_FILE)
+    for row in rows:
+        for name in FIELDS:
+            if name in columns:
+                completed.add((row["episode"], name))
+    for entry in load_log():
+        completed.add((entry["episode"], entry["field"]))
+    return completed
+
+def merge_log_into_csvs():
+    """Fold finished work from the extraction log into both CSVs, leaving the rest in the log.
+
+    A field only becomes a CSV column once every episode has it, so a column in the CSV always means
+    "extracted for every row". Merged entries leave the log, so later hand corrections to the CSV stay.
+    Merged values start out raw in the normalised CSV until the normaliser runs.
+    """
+    entries = load_log()
+    if not entries:
+        return
+
+    columns, rows = read_csv(OUTPUT_FILE)
+    by_episode = {row["episode"]: row for row in rows}
+    episodes = set(by_episode) | {entry["episode"] for entry in entries}
+    logged = {}
+    for entry in entries:
+        logged.setdefault(entry["field"], set()).add(entry["episode"])
+    ready = [name for name in FIELDS if name in columns or logged.get(name, set()) >= episodes]
+
+    merged, pending = [], []
+    for entry in entries:
+        (merged if entry["field"] in ready else pending).append(entry)
+    for entry in merged:
+        row = by_episode.get(entry["episode"])
+        if row is None:
+            row = {"episode": entry["episode"], "guest": entry["guest"]}
+            by_episode[entry["episode"]] = row
+            rows.append(row)
+        row[entry["field"]] = entry["value"] or ""
+    write_columns = ["episode", "guest"] + ready
+    if merged:
+        write_csv(OUTPUT_FILE, write_columns, rows)
+
+    norm_columns, norm_rows = read_csv(NORMALISED_FILE)
+    if norm_rows and merged:
+        norm_by_episode = {row["episode"]: row for row in norm_rows}
+        for row in rows:
+            norm_row = norm_by_episode.get(row["episode"])
+            if norm_row is None:
+                norm_rows.append(dict(row))
+                continue
+            for name in ready:
+                if name not in norm_columns:
+                    norm_row[name] = row.get(name, "")
+        # re-extracted values (--redo) replace the old normalised ones until the normaliser runs again
+        for entry in merged:
+            norm_by_episode.get(entry["episode"], {})[entry["field"]] = entry["value"] or ""
+        write_csv(NORMALISED_FILE, write_columns, norm_rows)
+
+    # keep only what couldn't be merged yet
+    tmp = LOG_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for entry in pending:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(tmp, LOG_FILE)
+    if pending:
+        print(f"{len({e['field'] for e in pending})} field(s) still being extracted; {len(pending)} values kept in {LOG_FILE}")
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redo", action="append", default=[], choices=list(FIELDS),
+                        help="re-extract this field for every episode (repeatable)")
+    args = parser.parse_args()
+
     files = sorted([f for f in os.listdir(INPUT_DIR) if f.endswith(".txt")])
     print(f"Found {len(files)} transcripts\n")
 
-    # load already processed episodes so we can resume if interrupted
-    processed = load_processed_episodes()
-    print(f"Already processed: {len(processed)} episodes\n")
-
-    # open csv in append mode so we don't overwrite existing results
-    file_exists = os.path.exists(OUTPUT_FILE)
-    with open(OUTPUT_FILE, "a", newline="", encoding="utf-8") as f:
-        print(f"CSV opened at: {os.path.abspath(OUTPUT_FILE)}")
-        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
-        
-        # only write header if file is new
-        if not file_exists:
-            writer.writeheader()
-
-        for filename in files:
-            path = os.path.join(INPUT_DIR, filename)
-            with open(path, "r", encoding="utf-8") as tf:
-                text = tf.read()
-
-            episode, guest = parse_metadata(text)
-
-            if episode in processed:
-                print(f"Skipping (already done): Ep {episode} – {guest}")
-                continue
-
-            print(f"Extracting: Ep {episode} – {guest}")
-            try:
-                choices = extract_choices(text, episode, guest)
-                writer.writerow(choices)
-                f.flush()  # write to disk immediately in case of interruption
-                print(f"  ✓ Done")
-            except Exception as e:
-                print(f"  ✗ Failed: {e}")
-
-            time.sleep(0.5)
-
+    # pick up anything a previous run logged but didn't merge
+    merge_log_into_csvs()
+    completed = {(ep, name) for ep, name in load_completed() if name not in args.redo}
+    print(f"Already extracted: {len(completed)} (episode, field) pairs\n")
+
+    try:
+        with telemetry.run("extractor", redo=args.redo), open(LOG_FILE, "a", encoding="utf-8") as log:
+            for filename in files:
+                path = os.path.join(INPUT_DIR, filename)
+                with open(path, "r", encoding="utf-8") as tf:
+                    text = tf.read()
+
+                episode, guest = parse_metadata(text)
+                missing = [name for name in FIELDS if (episode, name) not in completed]
+
+                if not missing:
+                    print(f"Skipping (already done): Ep {episode} – {guest}")
+                    telemetry.skipped()
+                    continue
+
+                print(f"Extracting {len(missing)} field(s): Ep {episode} – {guest}")
+                excerpt = menu_excerpt(text, missing)
+                print(f"  Sending {len(excerpt):,} of {len(text):,} characters")
+                try:
+                    with telemetry.item(f"Ep {episode}", fields=len(missing), chars_sent=len(excerpt)):
+                        choices = extract_choices(excerpt, missing)
+                    for name, value in choices.items():
+                        log.write(json.dumps({"episode": episode, "guest": guest, "field": name, "value": value}, ensure_ascii=False) + "\n")
+                    log.flush()  # write to disk immediately in case of interruption
+                    print(f"  ✓ Done")
+                except Exception as e:
+                    print(f"  ✗ Failed: {e}")
+
+                time.sleep(0.5)
+                telemetry.paced(0.5)
+    finally:
+        # also on Ctrl-C, so everything logged so far reaches the CSVs
+        merge_log_into_csvs()
     print(f"\nDone! Saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
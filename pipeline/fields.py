@@ -0,0 +1,12 @@
+# Every column extracted from a transcript, in CSV order, with the description the prompt uses for it.
+# Adding a field here is all it takes: the next extractor run asks for it, and only for episodes missing it.
+FIELDS = {
+    "starter": "the starter",
+    "main": "the main course",
+    "dessert": "the dessert",
+    "drink": "the drink",
+    "still_or_sparkling": "still or sparkling water",
+    "poppadoms_or_bread": "poppadoms or bread",
+    "christmas_dinner": "a christmas dinner (christmas special episodes only)",
+    "side_dish": 'the side dish to accompany the main course, which may be referred to as "side dish" or just "side"',
+}
@@ -1,20 +1,41 @@
 import os
+import sys
 import json
 import csv
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import anthropic
 import pandas as pd
 from dotenv import load_dotenv
 
 load_dotenv()
 
-anthropic_client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from offmenu import replay
+import telemetry
+
+anthropic_client = replay.wrap(
+    "anthropic",
+    lambda: anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), http_client=telemetry.anthropic_http_client())
+)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INPUT_FILE = os.path.join(BASE_DIR, "data", "menu_choices.csv")
 OUTPUT_FILE = os.path.join(BASE_DIR, "data", "menu_choices_normalised.csv")
 REVIEW_FILE = os.path.join(BASE_DIR, "data", "normalisation_review.json")
+CACHE_FILE = os.path.join(BASE_DIR, "data", "normalisation_cache.json")
+
+COLUMNS_TO_NORMALISE = ["starter", "main", "dessert", "drink", "still_or_sparkling", "poppadoms_or_bread", "side_dish"]
 
-COLUMNS_TO_NORMALISE = ["side_dish"]
+MAX_OUTPUT_TOKENS = 4096
+MAX_BATCH_SIZE = 50
+MAX_WORKERS = 8
+REQUESTS_PER_MINUTE = 50
+# rough output cost of one {"original", "normalised", "confidence"} object: the JSON scaffolding,
+# the original echoed back and a normalised form of up to the same length (~4 chars per token)
+ITEM_OVERHEAD_TOKENS = 25
 
 NORMALISE_PROMPT_PASS1 = """You are helping normalise menu choice descriptions from the Off Menu podcast into short canonical names.
 
@@ -66,12 +87,16 @@ def normalise_batch(values: list[str], prompt: str) -> list[dict]:
 
     response = anthropic_client.messages.create(
         model="claude-haiku-4-5-20251001",
-        max_tokens=4096,
+        max_tokens=MAX_OUTPUT_TOKENS,
         messages=[{
             "role": "user",
             "content": prompt + "\n\n" + items_text
         }]
     )
+    telemetry.add_usage(response.usage)
+
+    if response.stop_reason == "max_tokens":
+        raise ValueError(f"response truncated at {MAX_OUTPUT_TOKENS} tokens for {len(values)} items")
 
     text = response.content[0].text.strip()
     if text.startswith("```"):
@@ -79,70 +104,225 @@ def normalise_batch(values: list[str], prompt: str) -> list[dict]:
         if text.startswith("json"):
             text = text[4:]
 
-    return json.loads(text.strip())
-
-
-def run_pass(df: pd.DataFrame, prompt: str, pass_name: str) -> tuple[pd.DataFrame, list[dict]]:
-    """Run a normalisation pass over all target columns."""
+    results = json.loads(text.strip())
+    if len(results) != len(values):
+        raise ValueError(f"expected {len(values)} results, got {len(results)}")
+    return results
+
+
+class RateLimiter:
+    """Spaces out calls across threads so no more than `per_minute` start in any minute."""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60 / per_minute
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(slot - now)
+        return slot - now
+
+
+rate_limiter = RateLimiter(REQUESTS_PER_MINUTE)
+
+
+def estimate_output_tokens(value: str) -> int:
+    return ITEM_OVERHEAD_TOKENS + len(value) // 2
+
+
+def make_batches(values: list[str]) -> list[list[str]]:
+    """Pack values into batches whose estimated output fits comfortably inside MAX_OUTPUT_TOKENS."""
+    budget = int(MAX_OUTPUT_TOKENS * 0.75)
+    batches, batch, used = [], [], 0
+    for v in values:
+        cost = estimate_output_tokens(v)
+        if batch and (used + cost > budget or len(batch) >= MAX_BATCH_SIZE):
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(v)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def normalise_with_bisection(values: list[str], prompt: str) -> dict[str, dict]:
+    """Normalise a batch, splitting it in half when the response is unusable so only the genuinely bad items are lost."""
+    telemetry.paced(rate_limiter.wait())
+    try:
+        with telemetry.item(f"batch of {len(values)}", values=len(values)):
+            results = normalise_batch(values, prompt)
+        return {
+            val: {"normalised": result["normalised"], "confidence": result["confidence"]}
+            for val, result in zip(values, results)
+        }
+    except (ValueError, KeyError, TypeError) as e:
+        # a truncated, unparseable or miscounted response: a smaller batch may well go through
+        if len(values) == 1:
+            print(f"  ✗ Failed: {values[0]!r}: {e}")
+            return {}
+        print(f"  Batch of {len(values)} failed ({e}), splitting")
+        telemetry.retry("batch split")
+        mid = len(values) // 2
+        return {**normalise_with_bisection(values[:mid], prompt), **normalise_with_bisection(values[mid:], prompt)}
+    except Exception as e:
+        # API errors (rate limits, overload, network) say nothing about the items; splitting would only
+        # multiply the calls, so leave the whole batch uncached for the next run
+        print(f"  ✗ Batch of {len(values)} failed: {e}")
+        return {}
+
+
+def load_cache() -> dict[str, dict[str, dict]]:
+    """Load the {pass: {original: {"normalised", "confidence"}}} store, seeding it from the review file on first use."""
+    if os.path.exists(CACHE_FILE):
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    cache = {}
+    if os.path.exists(REVIEW_FILE):
+        with open(REVIEW_FILE, "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                # failed values were written out as low-confidence copies of the original, so they
+                # can't be told apart from genuine low results; leave them all to be normalised again
+                if item["confidence"] == "low":
+                    continue
+                cache.setdefault(item["pass"], {})[item["original"]] = {
+                    "normalised": item["normalised"],
+                    "confidence": item["confidence"]
+                }
+        print(f"Seeded normalisation cache from {REVIEW_FILE}")
+    return cache
+
+
+def drop_cached(cache: dict, confidences: list[str]) -> int:
+    """Forget cached results with these confidences so this run normalises them again."""
+    dropped = 0
+    for results in cache.values():
+        for original in [v for v, r in results.items() if r["confidence"] in confidences]:
+            del results[original]
+            dropped += 1
+    return dropped
+
+
+def save_cache(cache: dict):
+    tmp = CACHE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, CACHE_FILE)
+
+
+def distinct_values(df: pd.DataFrame) -> list[str]:
+    """Distinct non-empty values across every target column, in first-seen order."""
+    distinct = {}
+    for col in COLUMNS_TO_NORMALISE:
+        for v in df[col].fillna("").tolist():
+            if v.strip():
+                distinct.setdefault(v, None)
+    return list(distinct)
+
+
+def normalise_all(values: list[str], cache: dict):
+    """Run both passes concurrently over values the cache hasn't seen.
+
+    Pass 2 work is queued as soon as the pass 1 results it depends on arrive, rather than
+    waiting for the whole of pass 1.
+    """
+    pass1 = cache.setdefault("pass1", {})
+    pass2 = cache.setdefault("pass2", {})
+    queued_pass2 = set()
+    prompts = {"pass1": NORMALISE_PROMPT_PASS1, "pass2": NORMALISE_PROMPT_PASS2}
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        pending = {}
+
+        def submit(pass_name, batch_values):
+            future = executor.submit(normalise_with_bisection, batch_values, prompts[pass_name])
+            pending[future] = (pass_name, batch_values)
+
+        def queue_pass2(pass1_values):
+            todo = []
+            for v in pass1_values:
+                if v not in pass1:
+                    continue  # failed in pass 1, leave it for the next run
+                out = pass1[v]["normalised"]
+                if out.strip() and out not in pass2 and out not in queued_pass2:
+                    queued_pass2.add(out)
+                    todo.append(out)
+            for batch in make_batches(todo):
+                submit("pass2", batch)
+
+        todo_pass1 = [v for v in values if v not in pass1]
+        print(f"  {len(values)} distinct values, {len(values) - len(todo_pass1)} cached for pass 1")
+        for batch in make_batches(todo_pass1):
+            submit("pass1", batch)
+        queue_pass2([v for v in values if v in pass1])
+
+        done_items = {"pass1": 0, "pass2": 0}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pass_name, batch_values = pending.pop(future)
+                results = future.result()
+                cache[pass_name].update(results)
+                done_items[pass_name] += len(batch_values)
+                print(f"  {pass_name}: {len(results)}/{len(batch_values)} normalised "
+                      f"({done_items[pass_name]} done, {len(pending)} batches in flight)")
+                if pass_name == "pass1":
+                    queue_pass2(batch_values)
+            save_cache(cache)
+
+
+def apply_pass(df: pd.DataFrame, pass_name: str, cache: dict) -> tuple[pd.DataFrame, list[dict]]:
+    """Write one pass's cached results into the target columns and collect items worth reviewing."""
     review_items = []
-    BATCH_SIZE = 50
+    known = cache.get(pass_name, {})
 
     for col in COLUMNS_TO_NORMALISE:
-        print(f"\n  Normalising column: {col}")
         values = df[col].fillna("").tolist()
-        to_process = [(i, v) for i, v in enumerate(values) if v.strip()]
-        print(f"  {len(to_process)} non-empty values")
-
-        results_by_index = {}
-
-        for batch_start in range(0, len(to_process), BATCH_SIZE):
-            batch = to_process[batch_start:batch_start + BATCH_SIZE]
-            batch_values = [v for _, v in batch]
-            batch_indices = [i for i, _ in batch]
-
-            print(f"  Processing items {batch_start + 1}–{min(batch_start + BATCH_SIZE, len(to_process))}...")
-
-            try:
-                results = normalise_batch(batch_values, prompt)
-                for idx, result in zip(batch_indices, results):
-                    results_by_index[idx] = result
-                    if result["confidence"] in ("low", "medium"):
-                        review_items.append({
-                            "pass": pass_name,
-                            "column": col,
-                            "row_index": idx,
-                            "guest": df.iloc[idx]["guest"],
-                            "original": result["original"],
-                            "normalised": result["normalised"],
-                            "confidence": result["confidence"]
-                        })
-            except Exception as e:
-                import traceback
-                traceback.print_exc()
-                for idx, val in zip(batch_indices, batch_values):
-                    results_by_index[idx] = {
-                        "original": val,
-                        "normalised": val,
-                        "confidence": "low"
-                    }
-
-        for i, val in enumerate(values):
-            if i in results_by_index:
-                df.at[i, col] = results_by_index[i]["normalised"]
+        for idx, val in enumerate(values):
+            if not val.strip():
+                continue
+            # failures aren't cached, so the next run retries them
+            result = known.get(val, {"normalised": val, "confidence": "low"})
+            df.at[idx, col] = result["normalised"]
+            if result["confidence"] in ("low", "medium"):
+                review_items.append({
+                    "pass": pass_name,
+                    "column": col,
+                    "row_index": idx,
+                    "guest": df.iloc[idx]["guest"],
+                    "original": val,
+                    "normalised": result["normalised"],
+                    "confidence": result["confidence"]
+                })
 
     return df, review_items
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redo", action="append", default=[], choices=["low", "medium"],
+                        help="re-normalise cached results with this confidence (repeatable)")
+    args = parser.parse_args()
+
     df = pd.read_csv(INPUT_FILE)
     df.columns = df.columns.str.strip().str.lower()
     df["guest"] = df["guest"].str.replace(r"[/\\]+$", "", regex=True).str.strip()
 
-    print("=== Pass 1: Removing descriptions and restaurant names ===")
-    df, review_pass1 = run_pass(df, NORMALISE_PROMPT_PASS1, "pass1")
+    cache = load_cache()
+    if args.redo:
+        print(f"Re-normalising {drop_cached(cache, args.redo)} cached results ({', '.join(args.redo)} confidence)")
+
+    print("=== Normalising (pass 1: descriptions and restaurant names, pass 2: core dish type) ===")
+    with telemetry.run("normalizer", workers=MAX_WORKERS, requests_per_minute=REQUESTS_PER_MINUTE):
+        normalise_all(distinct_values(df), cache)
 
-    print("\n=== Pass 2: Reducing to core dish type ===")
-    df, review_pass2 = run_pass(df, NORMALISE_PROMPT_PASS2, "pass2")
+    df, review_pass1 = apply_pass(df, "pass1", cache)
+    df, review_pass2 = apply_pass(df, "pass2", cache)
 
     df.to_csv(OUTPUT_FILE, index=False)
     print(f"\nSaved normalised CSV to {OUTPUT_FILE}")
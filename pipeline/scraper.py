@@ -3,6 +3,7 @@ from bs4 import BeautifulSoup
 import fitz  # this is pymupdf
 import os
 import time
+import telemetry
 
 BASE_URL = "https://www.offmenupodcast.co.uk"
 TRANSCRIPTS_URL = f"{BASE_URL}/transcripts"
@@ -15,6 +16,7 @@ def setup_dirs():
 
 def get_pdf_links():
     response = requests.get(TRANSCRIPTS_URL)
+    telemetry.observe_response(response)
     soup = BeautifulSoup(response.text, "html.parser")
 
     episodes = []
@@ -35,6 +37,7 @@ def get_pdf_links():
 def download_pdf(url, filepath):
     headers = {"Cache-Control": "no-cache", "Pragma": "no-cache"}
     response = requests.get(url)
+    telemetry.observe_response(response)
     response.raise_for_status()
     with open(filepath, "wb") as f:
         f.write(response.content)
@@ -50,30 +53,34 @@ def extract_text(pdf_path, txt_path):
 def main():
     print("Script Started")
     setup_dirs()
-    episodes = get_pdf_links()
-    print(f"Found {len(episodes)} transcripts\n")
+    with telemetry.run("scraper"):
+        episodes = get_pdf_links()
+        print(f"Found {len(episodes)} transcripts\n")
 
-    for ep in episodes:
-        # build a clean filename from the label, e.g. "Ep 306 Marian Keyes"
-        safe_name = ep["label"].replace("/", "-").replace(" ", "_")
-        pdf_path = os.path.join(PDF_DIR, f"{safe_name}.pdf")
-        txt_path = os.path.join(TEXT_DIR, f"{safe_name}.txt")
+        for ep in episodes:
+            # build a clean filename from the label, e.g. "Ep 306 Marian Keyes"
+            safe_name = ep["label"].replace("/", "-").replace(" ", "_")
+            pdf_path = os.path.join(PDF_DIR, f"{safe_name}.pdf")
+            txt_path = os.path.join(TEXT_DIR, f"{safe_name}.txt")
 
-        if os.path.exists(txt_path):
-            print(f"Skipping (already done): {ep['label']}")
-            continue
+            if os.path.exists(txt_path):
+                print(f"Skipping (already done): {ep['label']}")
+                telemetry.skipped()
+                continue
 
-        print(f"Downloading: {ep['label']}")
-        try:
-            if not os.path.exists(pdf_path):
-                download_pdf(ep["url"], pdf_path)
-            download_pdf(ep["url"], pdf_path)
-            extract_text(pdf_path, txt_path)
-            print(f"  ✓ Saved text")
-        except Exception as e:
-            print(f"  ✗ Failed: {e}")
+            print(f"Downloading: {ep['label']}")
+            try:
+                with telemetry.item(ep["label"]):
+                    if not os.path.exists(pdf_path):
+                        download_pdf(ep["url"], pdf_path)
+                    download_pdf(ep["url"], pdf_path)
+                    extract_text(pdf_path, txt_path)
+                print(f"  ✓ Saved text")
+            except Exception as e:
+                print(f"  ✗ Failed: {e}")
 
-        time.sleep(0.5)  # be polite to their server
+            time.sleep(0.5)  # be polite to their server
+            telemetry.paced(0.5)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
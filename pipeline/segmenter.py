@@ -0,0 +1,80 @@
+import re
+
+# keyword cues for each menu category, keyed by the CSV column they feed
+MENU_CUES = {
+    "starter": [r"\bstarters?\b", r"\bappeti[sz]ers?\b"],
+    "main": [r"\bmain course\b", r"\bmains?\b"],
+    "side_dish": [r"\bside dish(es)?\b", r"\bsides?\b"],
+    "dessert": [r"\bdesserts?\b", r"\bpudding\b"],
+    "drink": [r"\bdrinks?\b", r"\bto drink\b"],
+    "still_or_sparkling": [r"\bstill or sparkling\b", r"\bsparkling water\b", r"\bstill water\b"],
+    "poppadoms_or_bread": [r"\bpoppadoms? or bread\b", r"\bpoppadoms?\b", r"\bbread basket\b"],
+    "christmas_dinner": [r"\bchristmas dinner\b"],
+}
+# phrases that open or frame the menu segment without naming a course
+FRAMING_CUES = [r"\bdream (meal|menu)\b", r"\bmagical restaurant\b", r"\bgenie\b", r"\bwhat would you like\b"]
+HOST_LINE = re.compile(r"^\s*(ed|james|ed gamble|james acaster)\s*:", re.IGNORECASE)
+
+WINDOW_BEFORE = 600   # characters of context kept before a cue
+WINDOW_AFTER = 2000   # the guest's answer usually runs well past the question
+MIN_COVERAGE = 0.6    # share of requested categories that must be cued to trust the windows
+MAX_SHARE = 0.7       # if windows cover more than this much of the text, just send it all
+
+_compiled = {cat: [re.compile(p, re.IGNORECASE) for p in pats] for cat, pats in MENU_CUES.items()}
+_framing = [re.compile(p, re.IGNORECASE) for p in FRAMING_CUES]
+
+
+def _line_start(text, pos):
+    return text.rfind("\n", 0, pos) + 1
+
+
+def _line_end(text, pos):
+    end = text.find("\n", pos)
+    return len(text) if end == -1 else end
+
+
+def find_menu_windows(text: str, categories: list[str] | None = None) -> tuple[list[tuple[int, int]], float]:
+    """Find the stretches of a transcript where the menu is discussed.
+
+    Returns merged (start, end) character spans and a confidence between 0 and 1: the share of
+    the requested categories cued in them, where cues on a host's line count for a category on their
+    own and guest-only mentions need a second hit to count.
+    """
+    categories = categories or [c for c in MENU_CUES if c != "christmas_dinner"]
+    spans = []
+    hits = {cat: 0.0 for cat in categories}
+
+    for cat in categories:
+        for pattern in _compiled.get(cat, []):  # a field with no cues drags confidence down, forcing the full text
+            for m in pattern.finditer(text):
+                on_host_line = bool(HOST_LINE.match(text[_line_start(text, m.start()):m.start()]))
+                hits[cat] += 1.0 if on_host_line else 0.5
+                spans.append((m.start(), m.end()))
+    for pattern in _framing:
+        for m in pattern.finditer(text):
+            spans.append((m.start(), m.end()))
+
+    if not spans:
+        return [], 0.0
+
+    # widen to whole lines and merge overlaps
+    windows = []
+    for start, end in sorted(spans):
+        start = _line_start(text, max(0, start - WINDOW_BEFORE))
+        end = _line_end(text, min(len(text), end + WINDOW_AFTER))
+        if windows and start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+
+    confidence = sum(1 for score in hits.values() if score >= 1.0) / len(categories)
+    return windows, confidence
+
+
+def menu_excerpt(text: str, categories: list[str] | None = None) -> str:
+    """The menu-discussion windows of a transcript, or the whole text when the windows look unreliable."""
+    windows, confidence = find_menu_windows(text, categories)
+    covered = sum(end - start for start, end in windows)
+    if confidence < MIN_COVERAGE or covered > MAX_SHARE * len(text):
+        return text
+    return "\n[...]\n".join(text[start:end].strip() for start, end in windows)
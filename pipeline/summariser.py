@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import time
+import voyageai
+from anthropic import Anthropic
+from dotenv import load_dotenv
+from chunker import parse_metadata
+import telemetry
+
+load_dotenv()
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from offmenu import replay
+from offmenu.vector_index import LocalVectorIndex
+
+INPUT_DIR = "data/cleaned"
+# {episode: {"guest", "summary"}}, read by offmenu/summaries.py
+OUTPUT_FILE = "data/episode_summaries.json"
+INDEX_DIR = "data/summary_index"
+SUMMARY_MODEL = "claude-haiku-4-5-20251001"
+EMBEDDING_MODEL = "voyage-3-lite"
+BATCH_SIZE = 128
+# well inside Haiku's context; only a handful of marathon live episodes come near it
+MAX_TRANSCRIPT_CHARS = 400_000
+
+anthropic = replay.wrap(
+    "anthropic",
+    lambda: Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), http_client=telemetry.anthropic_http_client())
+)
+
+PROMPT_TEMPLATE = """Below is a transcript of an episode of Off Menu, the podcast where Ed Gamble and James Acaster ask a guest to choose their dream meal.
+
+Write a summary of the episode in at most 100 words of plain prose, with no heading or preamble. Cover:
+- who the guest is
+- the main topics and stories, especially any that aren't about food
+- the tone, including any emotional, awkward or heated moments
+- recurring jokes or bits
+Don't list the menu choices; those are stored separately.
+
+TRANSCRIPT:
+{transcript}"""
+
+def summarise(transcript):
+    response = anthropic.messages.create(
+        model=SUMMARY_MODEL,
+        max_tokens=300,
+        messages=[{"role": "user", "content": PROMPT_TEMPLATE.format(transcript=transcript[:MAX_TRANSCRIPT_CHARS])}]
+    )
+    telemetry.add_usage(response.usage)
+    return response.content[0].text.strip()
+
+def load_summaries():
+    if not os.path.exists(OUTPUT_FILE):
+        return {}
+    with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_summaries(summaries):
+    tmp = OUTPUT_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(summaries, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, OUTPUT_FILE)
+
+def build_index(summaries):
+    # a few hundred short texts, so the whole index is simply re-embedded each run
+    voyage = replay.wrap("voyage", lambda: voyageai.Client(api_key=os.getenv("VOYAGE_API_KEY")))
+    episodes = sorted(summaries)
+    vectors = []
+    for batch_start in range(0, len(episodes), BATCH_SIZE):
+        batch = episodes[batch_start: batch_start + BATCH_SIZE]
+        # the guest's name goes in too, so "the episode with X" finds it
+        texts = [f"{summaries[ep]['guest']}: {summaries[ep]['summary']}" for ep in batch]
+        with telemetry.item(f"embed summaries {batch_start + 1}–{batch_start + len(batch)}", summaries=len(batch)):
+            result = voyage.embed(texts, model=EMBEDDING_MODEL, input_type="document")
+            telemetry.add_usage(result)
+        vectors.extend(result.embeddings)
+
+    LocalVectorIndex.save(
+        [f"ep{ep}_summary" for ep in episodes],
+        vectors,
+        [{"episode": ep, "guest": summaries[ep]["guest"]} for ep in episodes],
+        INDEX_DIR
+    )
+    print(f"Saved summary index with {len(episodes)} episodes to {INDEX_DIR}")
+
+def main():
+    files = sorted([f for f in os.listdir(INPUT_DIR) if f.endswith(".txt")])
+    print(f"Found {len(files)} transcripts\n")
+    summaries = load_summaries()
+
+    with telemetry.run("summariser", model=SUMMARY_MODEL):
+        for filename in files:
+            with open(os.path.join(INPUT_DIR, filename), "r", encoding="utf-8") as f:
+                text = f.read()
+            episode, guest = parse_metadata(text)
+
+            if episode in summaries:
+                print(f"Skipping (already done): Ep {episode} – {guest}")
+                telemetry.skipped()
+                continue
+
+            print(f"Summarising: Ep {episode} – {guest}")
+            try:
+                with telemetry.item(f"Ep {episode}", chars=len(text)):
+                    summaries[episode] = {"guest": guest, "summary": summarise(text)}
+                save_summaries(summaries)  # save after each episode in case of interruption
+                print(f"  ✓ Done")
+            except Exception as e:
+                print(f"  ✗ Failed: {e}")
+
+            time.sleep(0.5)
+            telemetry.paced(0.5)
+
+        if summaries:
+            build_index(summaries)
+
+    print(f"\nDone! {len(summaries)} summaries saved to {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""Structured run records for the pipeline scripts.
+
+Each script wraps its work in run(stage) and each unit of work (a transcript, a batch) in item(label):
+
+    with telemetry.run("extractor"):
+        for ...:
+            with telemetry.item(f"Ep {episode}"):
+                response = anthropic.messages.create(...)
+                telemetry.add_usage(response.usage)
+
+Item and run records are appended to data/pipeline_runs.jsonl and a summary is printed when the run ends.
+Anthropic clients built with anthropic_http_client() also report every HTTP response, which is where
+status codes (429s, 529s and the SDK's own retries) and rate-limit headroom headers come from.
+
+    python pipeline/telemetry.py            # summaries of recent runs, for spotting regressions
+    python pipeline/telemetry.py extractor  # just one stage
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+
+RUNS_FILE = "data/pipeline_runs.jsonl"
+# "off" to keep the summary but write nothing to disk
+WRITE_RECORDS = os.getenv("OFFMENU_PIPELINE_TELEMETRY", "on").lower() != "off"
+
+RATE_LIMIT_HEADERS = {
+    "anthropic-ratelimit-requests-remaining": "requests",
+    "anthropic-ratelimit-tokens-remaining": "tokens",
+    "anthropic-ratelimit-input-tokens-remaining": "input_tokens",
+    "anthropic-ratelimit-output-tokens-remaining": "output_tokens",
+}
+# set by the Anthropic SDK on every request: 0 for the first attempt, then 1, 2, ... for its retries
+RETRY_COUNT_HEADER = "x-stainless-retry-count"
+
+_current = None
+_local = threading.local()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class Item:
+    def __init__(self, label, attrs):
+        self.label = label
+        self.attrs = attrs
+        self.status = "ok"
+        self.tokens = {}
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Run:
+    def __init__(self, stage, config):
+        self.id = uuid.uuid4().hex[:8]
+        self.stage = stage
+        self.config = config
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+        self.item_walls = []
+        self.failed = 0
+        self.skipped = 0
+        self.tokens = {}
+        self.retries = {}
+        self.throttle_events = 0
+        self.throttle_wait_s = 0.0
+        self.pacing_wait_s = 0.0
+        self.http_requests = 0
+        self.http_statuses = {}
+        self.min_remaining = {}
+        self.last_remaining = {}
+
+    def _write(self, record):
+        if not WRITE_RECORDS:
+            return
+        os.makedirs(os.path.dirname(RUNS_FILE) or ".", exist_ok=True)
+        with self.lock, open(RUNS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _count(self, counter, key, amount=1):
+        with self.lock:
+            counter[key] = counter.get(key, 0) + amount
+
+    def record_item(self, item, wall_s):
+        with self.lock:
+            self.item_walls.append(wall_s)
+            self.failed += item.status == "failed"
+        self._write({
+            "type": "item", "run_id": self.id, "stage": self.stage, "label": item.label,
+            "status": item.status, "wall_s": round(wall_s, 3), "tokens": item.tokens, **item.attrs
+        })
+
+    def observe_response(self, response):
+        with self.lock:
+            self.http_requests += 1
+            status = str(response.status_code)
+            self.http_statuses[status] = self.http_statuses.get(status, 0) + 1
+            for header, name in RATE_LIMIT_HEADERS.items():
+                value = response.headers.get(header)
+                if value is not None and value.isdigit():
+                    self.last_remaining[name] = int(value)
+                    self.min_remaining[name] = min(int(value), self.min_remaining.get(name, int(value)))
+        if response.status_code == 429:
+            retry_after = response.headers.get("retry-after")
+            throttled(float(retry_after) if retry_after and retry_after.replace(".", "", 1).isdigit() else 0.0)
+        # a retryable status may still be the last attempt, so retries are counted from the requests
+        # that actually went out again: the SDK numbers each attempt in this header
+        request = getattr(response, "request", None)
+        attempt = request.headers.get(RETRY_COUNT_HEADER) if request is not None else None
+        if attempt and attempt.isdigit() and int(attempt) > 0:
+            retry("sdk retry")
+
+    def summary(self):
+        wall = time.perf_counter() - self.start
+        processed = len(self.item_walls)
+        return {
+            "type": "run",
+            "run_id": self.id,
+            "stage": self.stage,
+            "config": self.config,
+            "started_at": self.started_at,
+            "wall_s": round(wall, 3),
+            "items": processed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "items_per_s": round(processed / wall, 3) if wall > 0 else None,
+            "item_wall_s": {
+                "mean": round(sum(self.item_walls) / processed, 3) if processed else None,
+                "p50": round(percentile(self.item_walls, 50), 3),
+                "p95": round(percentile(self.item_walls, 95), 3),
+                "max": round(max(self.item_walls, default=0.0), 3),
+            },
+            "tokens": self.tokens,
+            "retries": self.retries,
+            "throttle_events": self.throttle_events,
+            "throttle_wait_s": round(self.throttle_wait_s, 3),
+            "pacing_wait_s": round(self.pacing_wait_s, 3),
+            "http_requests": self.http_requests,
+            "http_statuses": self.http_statuses,
+            "rate_limit_min_remaining": self.min_remaining,
+            "rate_limit_last_remaining": self.last_remaining,
+        }
+
+
+def print_summary(s):
+    print(f"\n=== {s['stage']} run {s['run_id']}: {s['items']} items in {s['wall_s']:.1f}s "
+          f"({s['items_per_s'] or 0:.2f} items/s) ===")
+    per_item = s["item_wall_s"]
+    if s["items"]:
+        print(f"  per item: mean {per_item['mean']:.2f}s  p50 {per_item['p50']:.2f}s  "
+              f"p95 {per_item['p95']:.2f}s  max {per_item['max']:.2f}s")
+    print(f"  {s['failed']} failed, {s['skipped']} skipped")
+    if s["tokens"]:
+        print("  tokens: " + ", ".join(f"{name} {count:,}" for name, count in sorted(s["tokens"].items())))
+    if s["http_requests"]:
+        statuses = ", ".join(f"{count}× {status}" for status, count in sorted(s["http_statuses"].items()))
+        print(f"  http: {s['http_requests']} requests ({statuses})")
+    if s["retries"]:
+        print("  retries: " + ", ".join(f"{count}× {reason}" for reason, count in sorted(s["retries"].items())))
+    if s["throttle_events"] or s["pacing_wait_s"]:
+        print(f"  throttled {s['throttle_events']}× ({s['throttle_wait_s']:.1f}s server-requested), "
+              f"{s['pacing_wait_s']:.1f}s waiting on our own rate limiter")
+    if s["rate_limit_min_remaining"]:
+        print("  rate-limit headroom (lowest remaining): "
+              + ", ".join(f"{name} {value:,}" for name, value in sorted(s["rate_limit_min_remaining"].items())))
+
+
+@contextmanager
+def run(stage, **config):
+    """Time a whole pipeline script. Items, tokens and retries recorded inside it roll up into one run record."""
+    global _current
+    _current = Run(stage, config)
+    try:
+        yield _current
+    finally:
+        summary = _current.summary()
+        _current._write(summary)
+        print_summary(summary)
+        _current = None
+
+
+@contextmanager
+def item(label, **attrs):
+    """Time one unit of work. An exception marks it failed and propagates."""
+    current = Item(label, dict(attrs))
+    if _current is None:
+        yield current
+        return
+    previous = getattr(_local, "item", None)
+    _local.item = current
+    start = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.status = "failed"
+        current.attrs["error"] = repr(e)
+        raise
+    finally:
+        _local.item = previous
+        _current.record_item(current, time.perf_counter() - start)
+
+
+def add_usage(usage):
+    """Count tokens from an Anthropic usage block or a Voyage embed result against the current item and run."""
+    if _current is None or usage is None:
+        return
+    counts = {}
+    for field, name in (("input_tokens", "input"), ("output_tokens", "output"),
+                        ("cache_read_input_tokens", "cache_read"), ("cache_creation_input_tokens", "cache_creation"),
+                        ("total_tokens", "embedding")):
+        value = getattr(usage, field, None)
+        if isinstance(value, int) and value:
+            counts[name] = value
+    current = getattr(_local, "item", None)
+    for name, value in counts.items():
+        _current._count(_current.tokens, name, value)
+        if current is not None:
+            current.tokens[name] = current.tokens.get(name, 0) + value
+
+
+def retry(reason):
+    if _current is not None:
+        _current._count(_current.retries, reason)
+
+
+def throttled(wait_s=0.0):
+    """A provider told us to slow down (a 429, or an explicit back-off we honoured)."""
+    if _current is not None:
+        with _current.lock:
+            _current.throttle_events += 1
+            _current.throttle_wait_s += wait_s
+
+
+def paced(wait_s):
+    """Time spent in our own client-side rate limiting."""
+    if _current is not None and wait_s > 0:
+        with _current.lock:
+            _current.pacing_wait_s += wait_s
+
+
+def skipped(count=1):
+    if _current is not None:
+        with _current.lock:
+            _current.skipped += count
+
+
+def observe_response(response):
+    """Record the status and rate-limit headers of an HTTP response (httpx or requests)."""
+    if _current is not None:
+        _current.observe_response(response)
+
+
+def anthropic_http_client():
+    """An httpx client for Anthropic(...) that reports every response, including the SDK's internal retries."""
+    import anthropic
+    return anthropic.DefaultHttpxClient(event_hooks={"response": [observe_response]})
+
+
+def load_runs(stage=None):
+    runs = []
+    if os.path.exists(RUNS_FILE):
+        with open(RUNS_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if record["type"] == "run" and (stage is None or record["stage"] == stage):
+                        runs.append(record)
+    return runs
+
+
+def main():
+    stage = sys.argv[1] if len(sys.argv) > 1 else None
+    runs = load_runs(stage)
+    if not runs:
+        print(f"No runs recorded in {RUNS_FILE}")
+        return
+    print(f"{'started':<18}{'stage':<14}{'run':<10}{'items':>7}{'failed':>8}{'items/s':>9}"
+          f"{'p95 s':>8}{'in tok':>11}{'out tok':>10}{'retries':>9}{'throttled':>11}")
+    for r in runs[-30:]:
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["started_at"]))
+        print(f"{started:<18}{r['stage']:<14}{r['run_id']:<10}{r['items']:>7}{r['failed']:>8}"
+              f"{r['items_per_s'] or 0:>9.2f}{r['item_wall_s']['p95']:>8.2f}"
+              f"{r['tokens'].get('input', 0):>11,}{r['tokens'].get('output', 0):>10,}"
+              f"{sum(r['retries'].values()):>9}{r['throttle_events']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+# the pipeline scripts import their siblings by bare name
+sys.path.insert(0, os.path.join(BASE_DIR, "pipeline"))
+
+os.environ["OFFMENU_REPLAY"] = "off"
+os.environ["OFFMENU_PIPELINE_TELEMETRY"] = "off"
+
+from benchmarks import standins
+
+# offmenu builds its clients at import time, so the stand-ins have to go in first
+ROUTES = {}
+standins.install(ROUTES)
+
+
+@pytest.fixture
+def routes():
+    ROUTES.clear()
+    yield ROUTES
+    ROUTES.clear()
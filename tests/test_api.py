@@ -0,0 +1,60 @@
+import asyncio
+
+from offmenu import api
+
+
+def post(path, body):
+    return {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }, body
+
+
+async def call(path, body, send):
+    scope, payload = post(path, body)
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.sleep(3600)
+
+    await api.app(scope, receive, send)
+
+
+def test_stream_slot_released_when_client_disconnects_before_body(routes):
+    async def scenario():
+        free = api._slots._value
+
+        async def gone(message):
+            raise OSError("client went away")
+
+        try:
+            await call("/ask/stream", b'{"question": "who was on episode 1?"}', gone)
+        except Exception:
+            pass
+        return free, api._slots._value
+
+    before, after = asyncio.run(scenario())
+    assert after == before
+
+
+def test_stream_slot_released_after_full_response(routes):
+    async def scenario():
+        free = api._slots._value
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await call("/ask/stream", b'{"question": "who was on episode 1?"}', send)
+        return free, api._slots._value, messages
+
+    before, after, messages = asyncio.run(scenario())
+    assert after == before
+    assert messages[0]["status"] == 200
+    assert b"".join(m.get("body", b"") for m in messages[1:])
@@ -0,0 +1,19 @@
+import pytest
+
+import chunker
+
+TEXT = ("ED: Welcome to Off Menu. What's your starter? GUEST: Soup, obviously. It's the best.\n" * 30).strip()
+
+
+@pytest.mark.parametrize("strategy", sorted(chunker.STRATEGIES))
+def test_chunks_cover_the_text(strategy):
+    chunks = chunker.STRATEGIES[strategy](TEXT, 200, 40)
+    assert chunks
+    assert chunks[-1].split()[-1] == TEXT.split()[-1]
+
+
+@pytest.mark.parametrize("strategy", sorted(chunker.STRATEGIES))
+@pytest.mark.parametrize("size, overlap", [(100, 100), (100, 150), (0, 0), (100, -1)])
+def test_rejects_windows_that_dont_advance(strategy, size, overlap):
+    with pytest.raises(ValueError):
+        chunker.STRATEGIES[strategy](TEXT, size, overlap)
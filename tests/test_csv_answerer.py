@@ -0,0 +1,82 @@
+import pandas as pd
+
+from offmenu.csv_answerer import ALL_CHOICE_COLUMNS, build_csv_result, render_answer
+
+
+def frame(rows):
+    return pd.DataFrame([{"episode": str(i + 1), "guest": guest, **{c: None for c in ALL_CHOICE_COLUMNS}, **choices}
+                         for i, (guest, choices) in enumerate(rows)])
+
+
+DF = frame([
+    ("Jane Doe", {"dessert": "Vanilla ice cream", "side_dish": "chips", "drink": "Jameson whiskey"}),
+    ("John Smith", {"dessert": "Peanut butter slice cream", "side_dish": "Chips"}),
+    ("Ada Lovelace", {"dessert": "Cheesecake", "side_dish": " chips ", "drink": "James's special tea"}),
+    ("Alan Turing", {"dessert": "Cheese board", "side_dish": "mac and cheese", "main": "Cheeseburger"}),
+    ("James Acaster", {"dessert": "Sticky toffee pudding", "side_dish": "mac and cheese"}),
+])
+
+
+def answer(question, df=DF):
+    return render_answer(question, build_csv_result(question, df, df))
+
+
+def test_most_common_folds_case_and_spacing():
+    assert answer("What is the most common side dish?") == (
+        "The most common side dish is chips, chosen by 3 of 5 guests, followed by mac and cheese (2)."
+    )
+
+
+def test_most_common_needs_a_normalised_column_and_a_clear_lead():
+    # starters are still free text, so variants of one dish are counted apart
+    df = frame([("Jane Doe", {"starter": "Prawn cocktail"}), ("John Smith", {"starter": "prawn cocktail"}),
+                ("Ada Lovelace", {"starter": "Prawn cocktail with Marie Rose sauce"})])
+    assert answer("What is the most common starter?", df) is None
+    df = frame([("Jane Doe", {"side_dish": "chips"}), ("John Smith", {"side_dish": "Chips"}),
+                ("Ada Lovelace", {"side_dish": "fries"}), ("Alan Turing", {"side_dish": "fries"})])
+    assert answer("What is the most common side dish?", df) is None
+
+
+def test_how_many_folds_case():
+    assert answer("How many guests chose chips as their side dish?") == "3 of 5 guests chose chips as their side dish."
+
+
+def test_whole_word_match_is_answered_locally():
+    df = frame([("Jane Doe", {"dessert": "Vanilla ice cream"}), ("Ada Lovelace", {"dessert": "Ice cream sundae"})])
+    assert answer("Has anyone chosen ice cream?", df) == (
+        '2 guests chose something matching "ice cream":\n'
+        "- Jane Doe: Vanilla ice cream (dessert)\n"
+        "- Ada Lovelace: Ice cream sundae (dessert)"
+    )
+
+
+def test_substring_matches_go_to_the_llm():
+    # "slice cream" contains "ice cream", and cheesecake and cheeseburger contain "cheese"
+    df = frame([("John Smith", {"dessert": "Peanut butter slice cream"})])
+    assert answer("Has anyone chosen ice cream?", df) is None
+    # some whole-word hits and some substring ones
+    assert answer("Has anyone chosen ice cream?") is None
+    assert answer("Has anyone chosen cheese?") is None
+    df = frame([("Ada Lovelace", {"dessert": "Cheesecake"}), ("Alan Turing", {"main": "Cheeseburger"})])
+    assert answer("Has anyone chosen cheese?", df) is None
+
+
+def test_partial_guest_name_goes_to_the_llm():
+    df = frame([("James Acaster", {"dessert": "Sticky toffee pudding"}), ("Ada Lovelace", {"drink": "James's special tea"})])
+    result = build_csv_result("What did James choose?", df, df)
+    assert result["kind"] == "search"
+    assert render_answer("What did James choose?", result) is None
+
+
+def test_direct_guest_lookup():
+    assert answer("What did Jane Doe choose as their dessert?") == (
+        "For Jane Doe (Episode 1), their dessert was Vanilla ice cream."
+    )
+
+
+def test_questions_about_other_guests_go_to_the_llm():
+    for question in ("Which guest chose the same dessert as Jane Doe?",
+                     "Who else had chips like Jane Doe?",
+                     "What did anyone pick as Jane Doe did?"):
+        assert build_csv_result(question, DF, DF)["kind"] == "guest"
+        assert answer(question) is None, question
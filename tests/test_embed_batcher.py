@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from offmenu import embed_batcher
+from offmenu.embed_batcher import EmbedBatcher
+
+
+class FakeVoyage:
+    def __init__(self, drop=0, block=None):
+        self.calls = []
+        self.drop = drop
+        self.block = block
+
+    def embed(self, texts, model, input_type):
+        self.calls.append(list(texts))
+        if self.block is not None:
+            self.block.wait()
+        embeddings = [[float(len(t))] for t in texts]
+        return SimpleNamespace(embeddings=embeddings[:len(embeddings) - self.drop], total_tokens=10 * len(texts))
+
+
+def test_coalesces_concurrent_callers():
+    client = FakeVoyage()
+    batcher = EmbedBatcher(client, "model", window_ms=50)
+    texts = [f"question {i}" * (i + 1) for i in range(20)]
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(batcher.embed, texts))
+    assert [r.embeddings[0] for r in results] == [[float(len(t))] for t in texts]
+    assert len(client.calls) < len(texts)
+    assert sum(len(c) for c in client.calls) == len(texts)
+
+
+def test_cancelled_callers_are_skipped():
+    client = FakeVoyage()
+    batcher = EmbedBatcher(client, "model")
+    gone, waiting = Future(), Future()
+    gone.cancel()
+    batcher._send([("gone", gone), ("waiting", waiting)])
+    assert client.calls == [["waiting"]]
+    assert waiting.result(timeout=1).embeddings == [[7.0]]
+
+
+def test_short_response_fails_every_caller():
+    batcher = EmbedBatcher(FakeVoyage(drop=1), "model")
+    futures = [Future() for _ in range(3)]
+    batcher._send([(f"text {i}", f) for i, f in enumerate(futures)])
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=1)
+
+
+def test_callers_time_out(monkeypatch):
+    release = threading.Event()
+    batcher = EmbedBatcher(FakeVoyage(block=release), "model", window_ms=1)
+    monkeypatch.setattr(embed_batcher, "EMBED_TIMEOUT", 0.05)
+    try:
+        with pytest.raises(TimeoutError):
+            batcher.embed("stuck")
+        with pytest.raises(TimeoutError):
+            asyncio.run(batcher.aembed("stuck too"))
+    finally:
+        release.set()
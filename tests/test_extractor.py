@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+import extractor
+from fields import FIELDS
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    cleaned = tmp_path / "cleaned"
+    cleaned.mkdir()
+    for episode, guest in (("1", "Guest One"), ("2", "Guest Two"), ("3", "Guest Three")):
+        (cleaned / f"ep{episode}.txt").write_text(f"EPISODE: {episode}\nGUEST: {guest}\n\nWhat's your starter?\n")
+    monkeypatch.setattr(extractor, "INPUT_DIR", str(cleaned))
+    monkeypatch.setattr(extractor, "OUTPUT_FILE", str(tmp_path / "menu_choices.csv"))
+    monkeypatch.setattr(extractor, "NORMALISED_FILE", str(tmp_path / "menu_choices_normalised.csv"))
+    monkeypatch.setattr(extractor, "LOG_FILE", str(tmp_path / "extraction_log.jsonl"))
+    monkeypatch.setattr(extractor.time, "sleep", lambda s: None)
+    monkeypatch.setattr("sys.argv", ["extractor.py"])
+    return tmp_path
+
+
+def fake_extract(calls, interrupt_on=None):
+    def extract(excerpt, fields):
+        episode = excerpt.split("\n")[0].split(":")[1].strip()
+        if episode == interrupt_on:
+            raise KeyboardInterrupt
+        calls.append((episode, list(fields)))
+        return {name: None if name == "christmas_dinner" else f"{name} {episode}" for name in fields}
+    return extract
+
+
+def test_csv_columns_count_as_done_even_when_empty(workdir):
+    # empty cells are fields the guest never chose; only a column the CSV lacks is still to do
+    columns = ["episode", "guest", "starter", "main"]
+    extractor.write_csv(extractor.OUTPUT_FILE, columns, [
+        {"episode": "1", "guest": "Guest One", "starter": "soup", "main": ""},
+        {"episode": "2", "guest": "Guest Two", "starter": "", "main": ""},
+    ])
+    with open(extractor.LOG_FILE, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"episode": "2", "guest": "Guest Two", "field": "dessert", "value": None}) + "\n")
+
+    assert extractor.load_completed() == {("1", "starter"), ("1", "main"), ("2", "starter"), ("2", "main"),
+                                          ("2", "dessert")}
+
+
+def test_interrupted_run_resumes_where_it_stopped(workdir, monkeypatch):
+    calls = []
+    monkeypatch.setattr(extractor, "extract_choices", fake_extract(calls, interrupt_on="2"))
+    with pytest.raises(KeyboardInterrupt):
+        extractor.main()
+    # what was logged before the interrupt is already in the CSV
+    _, rows = extractor.read_csv(extractor.OUTPUT_FILE)
+    assert [row["episode"] for row in rows] == ["1"]
+
+    calls.clear()
+    monkeypatch.setattr(extractor, "extract_choices", fake_extract(calls))
+    extractor.main()
+    assert calls == [("2", list(FIELDS)), ("3", list(FIELDS))]
+
+    # nothing left to do, including the fields the guests never chose
+    calls.clear()
+    extractor.main()
+    assert calls == []
+    _, rows = extractor.read_csv(extractor.OUTPUT_FILE)
+    assert {row["episode"]: row["starter"] for row in rows} == {"1": "starter 1", "2": "starter 2", "3": "starter 3"}
+
+
+def write_full_csv(path, rows, fields):
+    extractor.write_csv(path, ["episode", "guest"] + fields,
+                        [{"episode": ep, "guest": guest, **{name: f"{name} {ep}" for name in fields}} for ep, guest in rows])
+
+
+def test_interrupted_new_field_stays_out_of_the_csv_until_complete(workdir, monkeypatch):
+    fields = [name for name in FIELDS if name != "side_dish"]
+    write_full_csv(extractor.OUTPUT_FILE, [("1", "Guest One"), ("2", "Guest Two"), ("3", "Guest Three")], fields)
+
+    calls = []
+    monkeypatch.setattr(extractor, "extract_choices", fake_extract(calls, interrupt_on="2"))
+    with pytest.raises(KeyboardInterrupt):
+        extractor.main()
+    assert "side_dish" not in extractor.read_csv(extractor.OUTPUT_FILE)[0]
+
+    calls.clear()
+    monkeypatch.setattr(extractor, "extract_choices", fake_extract(calls))
+    extractor.main()
+    assert calls == [("2", ["side_dish"]), ("3", ["side_dish"])]
+    columns, rows = extractor.read_csv(extractor.OUTPUT_FILE)
+    assert "side_dish" in columns
+    assert [row["side_dish"] for row in rows] == ["side_dish 1", "side_dish 2", "side_dish 3"]
+
+
+def test_hand_corrections_survive_later_runs(workdir, monkeypatch):
+    calls = []
+    monkeypatch.setattr(extractor, "extract_choices", fake_extract(calls))
+    extractor.main()
+    columns, rows = extractor.read_csv(extractor.OUTPUT_FILE)
+    rows[0]["starter"] = "corrected by hand"
+    extractor.write_csv(extractor.OUTPUT_FILE, columns, rows)
+
+    extractor.main()
+    assert extractor.read_csv(extractor.OUTPUT_FILE)[1][0]["starter"] == "corrected by hand"
+
+
+def test_redo_replaces_normalised_values(workdir, monkeypatch):
+    rows = [("1", "Guest One"), ("2", "Guest Two"), ("3", "Guest Three")]
+    write_full_csv(extractor.OUTPUT_FILE, rows, list(FIELDS))
+    extractor.write_csv(extractor.NORMALISED_FILE, ["episode", "guest"] + list(FIELDS),
+                        [{"episode": ep, "guest": guest, **{name: "old" for name in FIELDS}} for ep, guest in rows])
+
+    monkeypatch.setattr(extractor, "extract_choices", lambda excerpt, fields: {name: "new" for name in fields})
+    monkeypatch.setattr("sys.argv", ["extractor.py", "--redo", "main"])
+    extractor.main()
+    norm = extractor.read_csv(extractor.NORMALISED_FILE)[1]
+    assert [row["main"] for row in norm] == ["new", "new", "new"]
+    assert [row["starter"] for row in norm] == ["old", "old", "old"]
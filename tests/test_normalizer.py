@@ -0,0 +1,65 @@
+import json
+
+import normalizer
+
+
+def review_item(pass_name, original, normalised, confidence):
+    return {"pass": pass_name, "column": "main", "row_index": 0, "guest": "Guest",
+            "original": original, "normalised": normalised, "confidence": confidence}
+
+
+def test_seeding_skips_low_confidence(tmp_path, monkeypatch):
+    review = tmp_path / "review.json"
+    review.write_text(json.dumps([
+        review_item("pass1", "Nino's pizza", "pizza", "medium"),
+        review_item("pass1", "a failed value", "a failed value", "low"),
+    ]))
+    monkeypatch.setattr(normalizer, "REVIEW_FILE", str(review))
+    monkeypatch.setattr(normalizer, "CACHE_FILE", str(tmp_path / "cache.json"))
+
+    cache = normalizer.load_cache()
+    assert cache == {"pass1": {"Nino's pizza": {"normalised": "pizza", "confidence": "medium"}}}
+
+
+def test_drop_cached():
+    cache = {
+        "pass1": {"a": {"normalised": "a", "confidence": "low"}, "b": {"normalised": "b", "confidence": "high"}},
+        "pass2": {"c": {"normalised": "c", "confidence": "medium"}},
+    }
+    assert normalizer.drop_cached(cache, ["low", "medium"]) == 2
+    assert cache == {"pass1": {"b": {"normalised": "b", "confidence": "high"}}, "pass2": {}}
+
+
+def test_bisects_on_bad_responses(monkeypatch):
+    calls = []
+
+    def fake_batch(values, prompt):
+        calls.append(list(values))
+        if "bad" in values:
+            raise ValueError("expected 2 results, got 1")
+        return [{"normalised": v.upper(), "confidence": "high"} for v in values]
+
+    monkeypatch.setattr(normalizer, "normalise_batch", fake_batch)
+    monkeypatch.setattr(normalizer.rate_limiter, "wait", lambda: 0.0)
+
+    results = normalizer.normalise_with_bisection(["a", "b", "c", "bad"], "prompt")
+    assert results == {v: {"normalised": v.upper(), "confidence": "high"} for v in "abc"}
+    assert calls[0] == ["a", "b", "c", "bad"]
+    assert ["bad"] in calls
+
+
+def test_api_errors_do_not_bisect(monkeypatch):
+    calls = []
+
+    class RateLimited(Exception):
+        pass
+
+    def fake_batch(values, prompt):
+        calls.append(list(values))
+        raise RateLimited("429 rate_limit_error")
+
+    monkeypatch.setattr(normalizer, "normalise_batch", fake_batch)
+    monkeypatch.setattr(normalizer.rate_limiter, "wait", lambda: 0.0)
+
+    assert normalizer.normalise_with_bisection(["a", "b", "c", "d"], "prompt") == {}
+    assert calls == [["a", "b", "c", "d"]]
@@ -0,0 +1,75 @@
+import asyncio
+
+import anthropic
+import pinecone
+import pytest
+import voyageai
+
+from offmenu import replay
+
+REQUEST = {"model": "claude-haiku-4-5-20251001", "max_tokens": 64,
+           "messages": [{"role": "user", "content": "What's the best starter?"}]}
+
+
+def unavailable():
+    raise AssertionError("replay built a real client")
+
+
+@pytest.fixture
+def cassette(tmp_path, monkeypatch):
+    monkeypatch.setattr(replay, "store", replay.CassetteStore(str(tmp_path / "cassettes.sqlite")))
+
+    def use(mode):
+        monkeypatch.setattr(replay, "MODE", mode)
+    return use
+
+
+def calls(make_anthropic, make_async_anthropic, make_voyage, make_pinecone):
+    claude = replay.wrap("anthropic", make_anthropic)
+    async_claude = replay.wrap("anthropic", make_async_anthropic, is_async=True)
+    voyage = replay.wrap("voyage", make_voyage)
+    pc = replay.wrap("pinecone", make_pinecone)
+
+    async def streamed():
+        async with async_claude.messages.stream(**REQUEST) as stream:
+            text = "".join([t async for t in stream.text_stream]).strip()
+            return text, (await stream.get_final_message()).content[0].text
+
+    message = claude.messages.create(**REQUEST)
+    embedding = voyage.embed(["soup"], model="voyage-3-lite", input_type="query")
+    has_index = pc.has_index("offmenu")
+    pc.create_index(name="offmenu", dimension=512, metric="cosine")
+    matches = pc.Index("offmenu").query(vector=embedding.embeddings[0], top_k=3, include_metadata=True).matches
+    return {
+        "text": message.content[0].text,
+        "input_tokens": message.usage.input_tokens,
+        "embedding": embedding.embeddings[0],
+        "has_index": has_index,
+        "matches": [(m.id, m.score, m.metadata["guest"]) for m in matches],
+        "streamed": asyncio.run(streamed()),
+    }
+
+
+def test_record_then_replay_without_clients(cassette):
+    cassette("record")
+    recorded = calls(lambda: anthropic.Anthropic(), lambda: anthropic.AsyncAnthropic(),
+                     lambda: voyageai.Client(), lambda: pinecone.Pinecone())
+
+    cassette("replay")
+    replayed = calls(unavailable, unavailable, unavailable, unavailable)
+    assert replayed == recorded
+    # the stream is answered from the messages.create recording
+    assert replayed["streamed"][0] == replayed["text"]
+
+
+def test_replay_miss_raises(cassette):
+    cassette("replay")
+    claude = replay.wrap("anthropic", unavailable)
+    with pytest.raises(replay.CassetteMiss):
+        claude.messages.create(**REQUEST)
+
+
+def test_request_key_depends_on_content():
+    key = replay.request_key("anthropic", "messages.create", (), REQUEST)
+    assert key == replay.request_key("anthropic", "messages.create", (), dict(reversed(list(REQUEST.items()))))
+    assert key != replay.request_key("anthropic", "messages.create", (), {**REQUEST, "max_tokens": 65})
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+import pytest
+
+from offmenu import retriever
+
+
+class FakeIndex:
+    def __init__(self, metadata):
+        self.metadata = metadata
+
+    def query(self, **kwargs):
+        return SimpleNamespace(matches=[SimpleNamespace(id=f"ep1_chunk{i}", score=1.0 - i / 10, metadata=m)
+                                        for i, m in enumerate(self.metadata)])
+
+
+def test_chunks_without_text_are_dropped(monkeypatch, caplog):
+    monkeypatch.setattr(retriever, "index", FakeIndex([
+        {"episode": "1", "guest": "Guest One", "text": "soup talk"},
+        {"episode": "1", "guest": "Guest One"},
+    ]))
+    monkeypatch.setattr(retriever.chunk_store, "get", lambda chunk_id: None)
+    chunks = retriever.query_index([0.1] * 4, None)
+    assert [c["text"] for c in chunks] == ["soup talk"]
+    assert "ep1_chunk1" in caplog.text
+
+
+def test_no_text_anywhere_fails_loudly(monkeypatch):
+    monkeypatch.setattr(retriever, "index", FakeIndex([{"episode": "1", "guest": "Guest One"}]))
+    monkeypatch.setattr(retriever.chunk_store, "get", lambda chunk_id: None)
+    with pytest.raises(RuntimeError):
+        retriever.query_index([0.1] * 4, None)
+
+
+@pytest.mark.parametrize("question, broad", [
+    ("Has anyone ever mentioned Greggs?", False),
+    ("Which guests talked about their mum?", False),
+    ("What was the vibe of the Christmas episodes?", True),
+    ("Summarise how guests feel about sparkling water", True),
+])
+def test_summaries_only_for_broad_questions(monkeypatch, question, broad):
+    monkeypatch.setattr(retriever, "HIERARCHICAL", "auto")
+    monkeypatch.setattr(retriever.summary_index, "available", lambda: True)
+    assert retriever.use_summaries(question, None) == broad
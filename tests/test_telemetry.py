@@ -0,0 +1,48 @@
+import anthropic
+import httpx2
+import pytest
+
+import telemetry
+
+MESSAGE = {"id": "msg_1", "type": "message", "role": "assistant", "model": "claude-haiku-4-5-20251001",
+           "content": [{"type": "text", "text": "hi"}], "stop_reason": "end_turn", "stop_sequence": None,
+           "usage": {"input_tokens": 3, "output_tokens": 1}}
+
+
+def client(statuses):
+    # the real SDK client (conftest swaps anthropic.Anthropic for a stand-in), over a scripted transport
+    responses = iter(statuses)
+
+    def handle(request):
+        status = next(responses)
+        if status == 200:
+            return httpx2.Response(200, json=MESSAGE)
+        return httpx2.Response(status, headers={"retry-after-ms": "1"}, json={"type": "error", "error": {}})
+
+    http_client = anthropic.DefaultHttpxClient(transport=httpx2.MockTransport(handle),
+                                               event_hooks={"response": [telemetry.observe_response]})
+    return anthropic._client.Anthropic(api_key="test", http_client=http_client, max_retries=2)
+
+
+def create(c):
+    return c.messages.create(model="claude-haiku-4-5-20251001", max_tokens=8,
+                             messages=[{"role": "user", "content": "hi"}])
+
+
+def test_retried_429_is_one_throttle_and_one_retry():
+    with telemetry.run("test") as run:
+        create(client([429, 200]))
+        summary = run.summary()
+    assert summary["http_statuses"] == {"429": 1, "200": 1}
+    assert summary["throttle_events"] == 1
+    assert summary["retries"] == {"sdk retry": 1}
+
+
+def test_final_attempt_is_not_a_retry():
+    with telemetry.run("test") as run:
+        with pytest.raises(anthropic.APIStatusError):
+            create(client([529, 529, 529]))
+        summary = run.summary()
+    assert summary["http_statuses"] == {"529": 3}
+    assert summary["retries"] == {"sdk retry": 2}
+    assert summary["throttle_events"] == 0
@@ -0,0 +1,18 @@
+from offmenu.tiering import choose_tier
+
+
+def chunk(episode, score, text="x" * 800):
+    return {"episode": episode, "score": score, "text": text}
+
+
+def test_single_episode_fact_stays_small():
+    chunks = [chunk("12", 0.9)] + [chunk("12", 0.5) for _ in range(19)]
+    tier, reasons = choose_tier("what did they say about the bread?", chunks, "12", "rag")
+    assert tier == "small"
+
+
+def test_synthesis_across_episodes_goes_large():
+    chunks = [chunk(str(i), 0.6) for i in range(10)]
+    tier, reasons = choose_tier("which guests have ever cried on the show?", chunks, None, "rag")
+    assert tier == "large"
+    assert "synthesis wording" in reasons
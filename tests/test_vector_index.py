@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from offmenu.vector_index import LocalVectorIndex
+
+
+def make_index(tmp_path, scheme, n=40, dim=16):
+    rng = np.random.RandomState(0)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    ids = [f"chunk{i}" for i in range(n)]
+    metadata = [{"episode": str(i % 4), "guest": f"Guest {i % 4}"} for i in range(n)]
+    metadata[0]["episodes"] = ["0", "3"]
+    LocalVectorIndex.save(ids, vectors, metadata, str(tmp_path), scheme=scheme)
+    return vectors, LocalVectorIndex.load(str(tmp_path))
+
+
+@pytest.mark.parametrize("scheme", ["int8", "binary"])
+def test_round_trip_finds_the_query_vector(tmp_path, scheme):
+    vectors, index = make_index(tmp_path, scheme)
+    result = index.query(vectors[7], top_k=3)
+    assert result.matches[0].id == "chunk7"
+    assert result.matches[0].score == pytest.approx(1.0, abs=1e-5)
+
+    ids, stored, metadata = LocalVectorIndex.read_all(str(tmp_path))
+    assert ids[7] == "chunk7" and stored.shape == vectors.shape
+
+
+def test_filters_match_episode_and_episodes(tmp_path):
+    vectors, index = make_index(tmp_path, "int8")
+    clause = {"$or": [{"episode": {"$eq": "3"}}, {"episodes": {"$in": ["3"]}}]}
+    result = index.query(vectors[0], top_k=50, filter=clause)
+    assert {m.id for m in result.matches} == {"chunk0"} | {f"chunk{i}" for i in range(3, 40, 4)}
+    assert index.query(vectors[0], top_k=5, filter={"episode": {"$in": ["99"]}}).matches == []
+
+
+def test_empty_index(tmp_path):
+    LocalVectorIndex.save([], [], [], str(tmp_path))
+    index = LocalVectorIndex.load(str(tmp_path))
+    assert index.query(np.ones(16), top_k=5).matches == []
+    ids, vectors, metadata = LocalVectorIndex.read_all(str(tmp_path))
+    assert ids == [] and len(vectors) == 0 and metadata == []